@@ -6,104 +6,105 @@
 # color. Allow grayscale division and colors of papers to be adjusted using
 # trackbars. Display original, grayscale, colored parts, and customized image.
 # Save results if desired. Destroy all windows when user has finished.
+#
+# Run without arguments to be asked everything, as before. With arguments,
+# nothing is asked and tkinter is never imported; with --no-gui no windows
+# are opened either and the customized image is saved straight away.
+#
+# Examples:
+#   python "Art 7.py"
+#   python "Art 7.py" photo.jpg --stacking dashboard --scheme color_scheme.json
+#   python "Art 7.py" photo.jpg --no-gui --breakpoints 60,120,180 \
+#       --palette "0,0,0;80,80,200;120,200,240;255,255,255" --output poster.png
+#   python "Art 7.py" photo.jpg --no-gui --scheme color_scheme.json --auto otsu --timing
 
 # Import libraries
+import time
+
+# Start the clock for --timing before the slow imports.
+START_TIME = time.perf_counter()
+
+import argparse
+import sys
+
 import cv2
 import numpy
-import os.path
-import json
-
-# Function to save the color scheme with stringified keys
-def save_color_scheme(current_color_scheme, file_path="color_scheme.json"):
-    # Convert tuple keys to strings
-    color_scheme_to_save = {str(k): v for k, v in current_color_scheme.items()}
-    
-    try:
-        with open(file_path, 'w', encoding='utf-8') as file:
-            json.dump(color_scheme_to_save, file)
-        print(f"Color scheme saved to {file_path}.")
-    except Exception as e:
-        print(f"An error occurred while saving the color scheme: {e}")
-        
-# Function to load a saved color scheme
-def load_color_scheme(file_path="color_scheme.json"):
-    if not os.path.exists(file_path):
-        print(f"No saved color scheme found at {file_path}.")
-        return None
-    with open(file_path, 'r', encoding='utf-8') as file:
-        loaded_color_scheme = json.load(file)
-    print(f"Color scheme loaded from {file_path}.")
-    return loaded_color_scheme
-
-# Initialize 'image' before it's being used
-image = None
-
-# Function to apply the loaded color scheme to the image
-# Rename 'image' to 'processed_image' inside apply_color_scheme function
-def apply_color_scheme(image_local, loaded_color_scheme):
-    # Check if loaded_color_scheme is None before proceeding
-    if loaded_color_scheme is None:
-        raise ValueError("Loaded color scheme is None. Please check if the color scheme was loaded correctly.")
-    
-    # Apply color scheme
-    for (lower, upper), color in loaded_color_scheme.items():
-        mask = cv2.inRange(image_local, lower, upper)  # Use 'image_local' inside the function
-        image_local[mask != 0] = color
-    
-    return image_local
-
-# Inside your main image processing logic
-
-# Ask if the user wants to load a saved color scheme
-load_choice = input("Would you like to load a saved color scheme? (y/n): ")
-if load_choice.lower() == 'y':
-    color_scheme_loaded = load_color_scheme()
-    
-    # Check if the color scheme was loaded correctly
-    if color_scheme_loaded is None:
-        print("No valid color scheme found. Continuing without loading.")
-    else:
-        if image is None:
-            print("No image loaded yet.")
+import dashboard
+import ingest
+import output_writer
+import posterize
+import preview
+import profiler
+import render_cache
+import trackbars
+from color_scheme import save_color_scheme, load_color_scheme
+
+# Cold start to first output (first frame shown, or file saved with
+# --no-gui) should stay under this many seconds. benchmark.py --startup
+# checks it.
+STARTUP_BUDGET_SECONDS = 1.0
+
+
+# Function to ask about loading and saving a color scheme, like the script
+# always did before it took arguments. Returns the file of the loaded color
+# scheme, or None if none was loaded.
+def color_scheme_prompts(scheme_file="color_scheme.json"):
+    loaded_scheme_file = None
+
+    # Ask if the user wants to load a saved color scheme
+    load_choice = input("Would you like to load a saved color scheme? (y/n): ")
+    if load_choice.lower() == 'y':
+        try:
+            color_scheme_loaded = load_color_scheme(scheme_file)
+        except (OSError, ValueError) as scheme_error:
+            print(f"Could not load color scheme: {scheme_error}")
+            color_scheme_loaded = None
+
+        # Check if the color scheme was loaded correctly
+        if color_scheme_loaded is None:
+            print("No valid color scheme found. Continuing without loading.")
+        else:
+            # The image is not open yet, so the scheme is used once it is: the
+            # trackbars start at its ranges and colors, like with --scheme.
+            loaded_scheme_file = scheme_file
+
+    # Initialize the color scheme to avoid "used-before-def" error
+    color_scheme = {
+        (0, 50): [255, 0, 0],  # Example entries for color scheme
+        (51, 100): [0, 255, 0],
+        (101, 150): [0, 0, 255]
+    }
+
+    # After adjusting the color scheme with trackbars, ask if the user wants to save it
+    save_choice = input("Would you like to save the current color scheme? (y/n): ")
+    if save_choice.lower() == 'y':
+        if not color_scheme:  # Check if the color scheme exists before saving
+            print("No color scheme to save.")
         else:
             try:
-                image = apply_color_scheme(image, color_scheme_loaded)
-                print("Color scheme applied successfully.")
-            except Exception as load_error:  # Changed exception variable name from 'e' to 'load_error'
-                print(f"Error applying color scheme: {load_error}")
-
-# Initialize the color scheme to avoid "used-before-def" error
-color_scheme = {
-    (0, 50): [255, 0, 0],  # Example entries for color scheme
-    (51, 100): [0, 255, 0],
-    (101, 150): [0, 0, 255]
-}
-
-# After adjusting the color scheme with trackbars, ask if the user wants to save it
-save_choice = input("Would you like to save the current color scheme? (y/n): ")
-if save_choice.lower() == 'y':
-    if not color_scheme:  # Check if the color scheme exists before saving
-        print("No color scheme to save.")
-    else:
-        try:
-            save_color_scheme(color_scheme)
-        except Exception as save_error:  # Changed exception variable name from 'e' to 'save_error'
-            print(f"Error saving color scheme: {save_error}")
-
-# Prompt user to enter name of original image.
-import tkinter as tk
-from tkinter import filedialog
-
-print("Select your original image using the dialog box.")
-root = tk.Tk()
-root.withdraw()  # Hide the main window
-filename = filedialog.askopenfilename(title="Select an Image", filetypes=[("Image files", "*.jpg *.jpeg *.png")])
+                save_color_scheme(color_scheme)
+            except Exception as save_error:  # Changed exception variable name from 'e' to 'save_error'
+                print(f"Error saving color scheme: {save_error}")
+    return loaded_scheme_file
+
+
+# Function to prompt user to enter name of original image. tkinter is only
+# imported here, so runs that name the image never load it.
+def choose_image_file():
+    import tkinter as tk
+    from tkinter import filedialog
+
+    print("Select your original image using the dialog box.")
+    root = tk.Tk()
+    root.withdraw()  # Hide the main window
+    filename = filedialog.askopenfilename(title="Select an Image", filetypes=[("Image files", "*.jpg *.jpeg *.png")])
+    root.destroy()
+
+    if not filename:
+        print("No file was selected. Please try again.")
+        return None
+    return filename
 
-if not filename:
-    print("No file was selected. Please try again.")
-    filename_valid = False
-else:
-    filename_valid = True
 
 # Function to stack windows horizontally or vertically
 def stack_windows(window_names, direction='horizontal', base_x=0, base_y=0, window_width=400, window_height=300):
@@ -119,389 +120,419 @@ def stack_windows(window_names, direction='horizontal', base_x=0, base_y=0, wind
         elif direction == 'vertical':
             y_offset += window_height  # Move next window below
 
-# Save original image. Create and save grayscale image, ensuring that it
-# has the right number of color channels (3).
-original_image = cv2.imread(filename, 1)
-grayscale_image_simple = cv2.imread(filename, 0)
-grayscale_image = cv2.cvtColor(grayscale_image_simple, cv2.COLOR_GRAY2BGR)
-
-## Create windows for display.
-cv2.namedWindow('Original Image')
-cv2.namedWindow('Grayscale Image')
-cv2.namedWindow('Grayscale Trackbars')
-cv2.namedWindow('Color01 Trackbars')
-cv2.namedWindow('Color02 Trackbars')
-cv2.namedWindow('Color03 Trackbars')
-cv2.namedWindow('Color04 Trackbars')
-cv2.namedWindow('Color05 Trackbars')
-cv2.namedWindow('Color06 Trackbars')
-cv2.namedWindow('Color07 Trackbars')
-cv2.namedWindow('Color08 Trackbars')
-cv2.namedWindow('Color09 Trackbars')
-cv2.namedWindow('Color10 Trackbars')
-cv2.namedWindow('Color01 Parts of Image')
-cv2.namedWindow('Color02 Parts of Image')
-cv2.namedWindow('Color03 Parts of Image')
-cv2.namedWindow('Color04 Parts of Image')
-cv2.namedWindow('Color05 Parts of Image')
-cv2.namedWindow('Color06 Parts of Image')
-cv2.namedWindow('Color07 Parts of Image')
-cv2.namedWindow('Color08 Parts of Image')
-cv2.namedWindow('Color09 Parts of Image')
-cv2.namedWindow('Color10 Parts of Image')
-cv2.namedWindow('Customized Image')
-
-# Stack the windows horizontally or vertically
-window_names = [
-    'Original Image', 'Grayscale Image', 'Grayscale Trackbars',
-    'Color01 Trackbars', 'Color02 Trackbars', 'Color03 Trackbars', 
-    'Color04 Trackbars', 'Color05 Trackbars', 'Color06 Trackbars',
-    'Color07 Trackbars', 'Color08 Trackbars', 'Color09 Trackbars', 
-    'Color10 Trackbars', 'Color01 Parts of Image', 'Color02 Parts of Image',
-    'Color03 Parts of Image', 'Color04 Parts of Image', 'Color05 Parts of Image', 
-    'Color06 Parts of Image', 'Color07 Parts of Image', 'Color08 Parts of Image', 
-    'Color09 Parts of Image', 'Color10 Parts of Image', 'Customized Image'
-]
-
-# Prompt user for stacking direction
-stacking_direction = input("How would you like to stack the windows? ('horizontal' or 'vertical'): ").lower()
-stack_windows(window_names, direction=stacking_direction)
-
-# Display original and grayscale images.
-cv2.imshow('Original Image', original_image)
-cv2.imshow('Grayscale Image', grayscale_image)
-
-# Create variable to read in the height, width, and number of channels (3) of
-# the original image.
-image_height = original_image.shape[0]
-image_width = original_image.shape[1]
-image_channels = original_image.shape[2]
-
-# Create the colored papers.
-Color01_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color02_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color03_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color04_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color05_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color06_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color07_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color08_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color09_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-Color10_paper = numpy.zeros((image_height, image_width, image_channels), numpy.uint8)
-
-# Create grayscale and color trackbar(s).
-cv2.createTrackbar('gs_break_01', 'Grayscale Trackbars', 50, 255, lambda x: None)
-cv2.createTrackbar('gs_break_02', 'Grayscale Trackbars', 85, 255, lambda x: None)
-cv2.createTrackbar('gs_break_03', 'Grayscale Trackbars', 127, 255, lambda x: None)
-cv2.createTrackbar('gs_break_04', 'Grayscale Trackbars', 170, 255, lambda x: None)  
-cv2.createTrackbar('gs_break_05', 'Grayscale Trackbars', 210, 255, lambda x: None)
-cv2.createTrackbar('gs_break_06', 'Grayscale Trackbars', 230, 255, lambda x: None)
-cv2.createTrackbar('gs_break_07', 'Grayscale Trackbars', 240, 255, lambda x: None)
-cv2.createTrackbar('gs_break_08', 'Grayscale Trackbars', 245, 255, lambda x: None)
-cv2.createTrackbar('gs_break_09', 'Grayscale Trackbars', 250, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color01', 'Color01 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color01', 'Color01 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color01', 'Color01 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color02', 'Color02 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color02', 'Color02 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color02', 'Color02 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color03', 'Color03 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color03', 'Color03 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color03', 'Color03 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color04', 'Color04 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color04', 'Color04 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color04', 'Color04 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color05', 'Color05 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color05', 'Color05 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color05', 'Color05 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color06', 'Color06 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color06', 'Color06 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color06', 'Color06 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color07', 'Color07 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color07', 'Color07 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color07', 'Color07 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color08', 'Color08 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color08', 'Color08 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color08', 'Color08 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color09', 'Color09 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color09', 'Color09 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color09', 'Color09 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Blue_Color10', 'Color10 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Green_Color10', 'Color10 Trackbars', 0, 255, lambda x: None)
-cv2.createTrackbar('Red_Color10', 'Color10 Trackbars', 0, 255, lambda x: None)
-
-# Initialize while look control variable. Then start the loop.
-keypressed = 1
-while (keypressed != 27 and keypressed !=ord('s')):
-
-    # Define the colors of the papers.
-    Blue_Color01 = cv2.getTrackbarPos('Blue_Color01', 'Color01 Trackbars')
-    Green_Color01 = cv2.getTrackbarPos('Green_Color01', 'Color01 Trackbars')
-    Red_Color01 = cv2.getTrackbarPos('Red_Color01', 'Color01 Trackbars')
-    Blue_Color02 = cv2.getTrackbarPos('Blue_Color02', 'Color02 Trackbars')
-    Green_Color02 = cv2.getTrackbarPos('Green_Color02', 'Color02 Trackbars')
-    Red_Color02 = cv2.getTrackbarPos('Red_Color02', 'Color02 Trackbars')
-    Blue_Color03 = cv2.getTrackbarPos('Blue_Color03', 'Color03 Trackbars')
-    Green_Color03 = cv2.getTrackbarPos('Green_Color03', 'Color03 Trackbars')
-    Red_Color03 = cv2.getTrackbarPos('Red_Color03', 'Color03 Trackbars')
-    Blue_Color04 = cv2.getTrackbarPos('Blue_Color04', 'Color04 Trackbars')
-    Green_Color04 = cv2.getTrackbarPos('Green_Color04', 'Color04 Trackbars')
-    Red_Color04 = cv2.getTrackbarPos('Red_Color04', 'Color04 Trackbars')    
-    Blue_Color05 = cv2.getTrackbarPos('Blue_Color05', 'Color05 Trackbars')
-    Green_Color05 = cv2.getTrackbarPos('Green_Color05', 'Color05 Trackbars')
-    Red_Color05 = cv2.getTrackbarPos('Red_Color05', 'Color05 Trackbars')    
-    Blue_Color06 = cv2.getTrackbarPos('Blue_Color06', 'Color06 Trackbars')
-    Green_Color06 = cv2.getTrackbarPos('Green_Color06', 'Color06 Trackbars')
-    Red_Color06 = cv2.getTrackbarPos('Red_Color06', 'Color06 Trackbars')
-    Blue_Color07 = cv2.getTrackbarPos('Blue_Color07', 'Color07 Trackbars')
-    Green_Color07 = cv2.getTrackbarPos('Green_Color07', 'Color07 Trackbars')
-    Red_Color07= cv2.getTrackbarPos('Red_Color07', 'Color07 Trackbars')
-    Blue_Color07 = cv2.getTrackbarPos('Blue_Color07', 'Color07 Trackbars')
-    Green_Color08 = cv2.getTrackbarPos('Green_Color08', 'Color08 Trackbars')
-    Red_Color08 = cv2.getTrackbarPos('Red_Color08', 'Color08 Trackbars')    
-    Blue_Color08 = cv2.getTrackbarPos('Blue_Color08', 'Color08 Trackbars')
-    Green_Color09 = cv2.getTrackbarPos('Green_Color09', 'Color09 Trackbars')
-    Red_Color09 = cv2.getTrackbarPos('Red_Color09', 'Color09 Trackbars')    
-    Blue_Color09 = cv2.getTrackbarPos('Blue_Color09', 'Color09 Trackbars')
-    Green_Color10 = cv2.getTrackbarPos('Green_Color10', 'Color10 Trackbars')
-    Red_Color10 = cv2.getTrackbarPos('Red_Color10', 'Color10 Trackbars')    
-    Blue_Color10 = cv2.getTrackbarPos('Blue_Color10', 'Color10 Trackbars')
-
-    # Output the current color settings to the Shell window
-    print(f"Color 01: Blue={Blue_Color01}, Green={Green_Color01}, Red={Red_Color01}")
-    print(f"Color 02: Blue={Blue_Color02}, Green={Green_Color02}, Red={Red_Color02}")
-    print(f"Color 03: Blue={Blue_Color03}, Green={Green_Color03}, Red={Red_Color03}")
-    print(f"Color 04: Blue={Blue_Color04}, Green={Green_Color04}, Red={Red_Color04}")
-    print(f"Color 05: Blue={Blue_Color05}, Green={Green_Color05}, Red={Red_Color05}")
-    print(f"Color 06: Blue={Blue_Color06}, Green={Green_Color06}, Red={Red_Color06}")
-    print(f"Color 07: Blue={Blue_Color07}, Green={Green_Color07}, Red={Red_Color07}")
-    print(f"Color 08: Blue={Blue_Color08}, Green={Green_Color08}, Red={Red_Color08}")
-    print(f"Color 09: Blue={Blue_Color09}, Green={Green_Color09}, Red={Red_Color09}")
-    print(f"Color 10: Blue={Blue_Color10}, Green={Green_Color10}, Red={Red_Color10}")
-
-    # Assign the colors to the colored papers. The \ extends the line of code.
-    Color01_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color01, Green_Color01, Red_Color01]
-    Color02_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color02, Green_Color02, Red_Color02]
-    Color03_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color03, Green_Color03, Red_Color03]
-    Color04_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color04, Green_Color04, Red_Color04]
-    Color05_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color05, Green_Color05, Red_Color05]
-    Color06_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color06, Green_Color06, Red_Color06]
-    Color07_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color07, Green_Color07, Red_Color07]
-    Color08_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color08, Green_Color08, Red_Color08]
-    Color09_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color09, Green_Color09, Red_Color09]
-    Color10_paper[0:image_height, 0:image_width, 0:image_channels] = \
-        [Blue_Color10, Green_Color10, Red_Color10]
-    
-    # Define the break point for "light" and "dark". Ensure right data type.
-    gs_break_01 = cv2.getTrackbarPos('gs_break_01', 'Grayscale Trackbars')
-    gs_break_02 = cv2.getTrackbarPos('gs_break_02', 'Grayscale Trackbars')
-    gs_break_03 = cv2.getTrackbarPos('gs_break_03', 'Grayscale Trackbars')
-    gs_break_04 = cv2.getTrackbarPos('gs_break_04', 'Grayscale Trackbars')
-    gs_break_05 = cv2.getTrackbarPos('gs_break_05', 'Grayscale Trackbars')
-    gs_break_06 = cv2.getTrackbarPos('gs_break_06', 'Grayscale Trackbars')
-    gs_break_07 = cv2.getTrackbarPos('gs_break_07', 'Grayscale Trackbars')
-    gs_break_08 = cv2.getTrackbarPos('gs_break_08', 'Grayscale Trackbars')
-    gs_break_09 = cv2.getTrackbarPos('gs_break_09', 'Grayscale Trackbars')
-    
-
-if gs_break_01 > gs_break_02:
-    cv2.setTrackbarPos('gs_break_01', 'Grayscale Trackbars', gs_break_02 - 1)
-
-if gs_break_02 > gs_break_03:
-    cv2.setTrackbarPos('gs_break_02', 'Grayscale Trackbars', gs_break_03 - 1)
-
-if gs_break_03 > gs_break_04:
-    cv2.setTrackbarPos('gs_break_03', 'Grayscale Trackbars', gs_break_04 - 1)
-
-if gs_break_04 > gs_break_05:
-    cv2.setTrackbarPos('gs_break_04', 'Grayscale Trackbars', gs_break_05 - 1)
-
-if gs_break_05 > gs_break_06:
-    cv2.setTrackbarPos('gs_break_05', 'Grayscale Trackbars', gs_break_06 - 1)
-
-if gs_break_06 > gs_break_07:
-    cv2.setTrackbarPos('gs_break_06', 'Grayscale Trackbars', gs_break_07 - 1)
-
-if gs_break_07 > gs_break_08:
-    cv2.setTrackbarPos('gs_break_07', 'Grayscale Trackbars', gs_break_08 - 1)
-
-if gs_break_08 > gs_break_09:
-    cv2.setTrackbarPos('gs_break_08', 'Grayscale Trackbars', gs_break_09 - 1)
-
-# Adjusting max values to ensure the trackbars don't exceed their limits
-
-if gs_break_09 > 254:
-    cv2.setTrackbarPos('gs_break_09', 'Grayscale Trackbars', 254)
-
-if gs_break_08 > 253:
-    cv2.setTrackbarPos('gs_break_08', 'Grayscale Trackbars', 253)
-
-if gs_break_07 > 252:
-    cv2.setTrackbarPos('gs_break_07', 'Grayscale Trackbars', 252)
-
-if gs_break_06 > 251:
-    cv2.setTrackbarPos('gs_break_06', 'Grayscale Trackbars', 251)
-
-if gs_break_05 > 250:
-    cv2.setTrackbarPos('gs_break_05', 'Grayscale Trackbars', 250)
-
-    min_grayscale_for_Color01 = [0, 0, 0]
-    max_grayscale_for_Color01 = [gs_break_01, gs_break_01, gs_break_01]
-    min_grayscale_for_Color02 = [gs_break_01+1, gs_break_01+1, gs_break_01+1]
-    max_grayscale_for_Color02 = [gs_break_02, gs_break_02, gs_break_02]
-    min_grayscale_for_Color03 = [gs_break_02+1, gs_break_02+1, gs_break_02+1]
-    max_grayscale_for_Color03 = [gs_break_03, gs_break_03, gs_break_03]
-    min_grayscale_for_Color04 = [gs_break_03+1, gs_break_03+1, gs_break_03+1]
-    max_grayscale_for_Color04 = [gs_break_04, gs_break_04, gs_break_04]
-    min_grayscale_for_Color05 = [gs_break_04+1, gs_break_04+1, gs_break_04+1]
-    max_grayscale_for_Color05 = [gs_break_05, gs_break_05, gs_break_05]
-    min_grayscale_for_Color06 = [gs_break_05+1, gs_break_05+1, gs_break_05+1]
-    max_grayscale_for_Color06 = [gs_break_06, gs_break_06, gs_break_06]
-    min_grayscale_for_Color07 = [gs_break_06+1, gs_break_06+1, gs_break_06+1]    
-    max_grayscale_for_Color07 = [gs_break_07, gs_break_07, gs_break_07]
-    min_grayscale_for_Color08 = [gs_break_07+1, gs_break_07+1, gs_break_07+1]
-    max_grayscale_for_Color08 = [gs_break_08, gs_break_08, gs_break_08]
-    min_grayscale_for_Color09 = [gs_break_08+1, gs_break_08+1, gs_break_08+1]
-    max_grayscale_for_Color09 = [gs_break_09, gs_break_09, gs_break_09]
-    min_grayscale_for_Color10 = [gs_break_09+1, gs_break_09+1, gs_break_09+1]
-    max_grayscale_for_Color10 = [255, 255, 255]
-
-    min_grayscale_for_Color01 = numpy.array(min_grayscale_for_Color01,
-                                            dtype="uint8")
-    max_grayscale_for_Color01 = numpy.array(max_grayscale_for_Color01,
-                                            dtype="uint8")
-    min_grayscale_for_Color02 = numpy.array(min_grayscale_for_Color02,
-                                            dtype="uint8")
-    max_grayscale_for_Color02 = numpy.array(max_grayscale_for_Color02,
-                                            dtype="uint8")
-    min_grayscale_for_Color03 = numpy.array(min_grayscale_for_Color03,
-                                            dtype="uint8")
-    max_grayscale_for_Color03 = numpy.array(max_grayscale_for_Color03,
-                                            dtype="uint8")
-    min_grayscale_for_Color04 = numpy.array(min_grayscale_for_Color04,
-                                            dtype="uint8")
-    max_grayscale_for_Color04 = numpy.array(max_grayscale_for_Color04,
-                                            dtype="uint8")
-    min_grayscale_for_Color05 = numpy.array(min_grayscale_for_Color05,
-                                            dtype="uint8")
-    max_grayscale_for_Color05 = numpy.array(max_grayscale_for_Color05,
-                                            dtype="uint8")
-    min_grayscale_for_Color06 = numpy.array(min_grayscale_for_Color06,
-                                            dtype="uint8")
-    max_grayscale_for_Color06 = numpy.array(max_grayscale_for_Color06,
-                                            dtype="uint8")
-    min_grayscale_for_Color07 = numpy.array(min_grayscale_for_Color07,
-                                            dtype="uint8")
-    max_grayscale_for_Color07 = numpy.array(max_grayscale_for_Color07,
-                                            dtype="uint8")
-    min_grayscale_for_Color08 = numpy.array(min_grayscale_for_Color08,
-                                            dtype="uint8")
-    max_grayscale_for_Color08 = numpy.array(max_grayscale_for_Color08,
-                                            dtype="uint8")
-    min_grayscale_for_Color09 = numpy.array(min_grayscale_for_Color09,
-                                            dtype="uint8")
-    max_grayscale_for_Color09 = numpy.array(max_grayscale_for_Color09,
-                                            dtype="uint8")
-    min_grayscale_for_Color10 = numpy.array(min_grayscale_for_Color10,
-                                            dtype="uint8")
-    max_grayscale_for_Color10 = numpy.array(max_grayscale_for_Color10,
-                                            dtype="uint8")  
-    # Create masks.
-    block_all_but_the_Color01_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color01,
-                                                   max_grayscale_for_Color01)
-    block_all_but_the_Color02_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color02,
-                                                   max_grayscale_for_Color02)
-    block_all_but_the_Color03_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color03,
-                                                   max_grayscale_for_Color03)
-    block_all_but_the_Color04_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color04,
-                                                   max_grayscale_for_Color04)
-    block_all_but_the_Color05_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color05,
-                                                   max_grayscale_for_Color05)
-    block_all_but_the_Color06_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color06,
-                                                   max_grayscale_for_Color06)
-    block_all_but_the_Color07_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color07,
-                                                   max_grayscale_for_Color07)
-    block_all_but_the_Color08_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color08,
-                                                   max_grayscale_for_Color08)
-    block_all_but_the_Color09_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color09,
-                                                   max_grayscale_for_Color09)
-    block_all_but_the_Color10_parts = cv2.inRange(grayscale_image,
-                                                   min_grayscale_for_Color10,
-                                                   max_grayscale_for_Color10)
-
-    # Apply masks to create colored parts.
-    Color01_parts_of_image = cv2.bitwise_or(Color01_paper, Color01_paper, mask=
-                                             block_all_but_the_Color01_parts)
-    Color02_parts_of_image = cv2.bitwise_or(Color02_paper, Color02_paper, mask=
-                                             block_all_but_the_Color02_parts)
-    Color03_parts_of_image = cv2.bitwise_or(Color03_paper, Color03_paper, mask=
-                                             block_all_but_the_Color03_parts)
-    Color04_parts_of_image = cv2.bitwise_or(Color04_paper, Color04_paper, mask=
-                                             block_all_but_the_Color04_parts)
-    Color05_parts_of_image = cv2.bitwise_or(Color05_paper, Color05_paper, mask=
-                                             block_all_but_the_Color05_parts)
-    Color06_parts_of_image = cv2.bitwise_or(Color06_paper, Color06_paper, mask=
-                                             block_all_but_the_Color06_parts)
-    Color07_parts_of_image = cv2.bitwise_or(Color07_paper, Color04_paper, mask=
-                                             block_all_but_the_Color07_parts)
-    Color08_parts_of_image = cv2.bitwise_or(Color08_paper, Color08_paper, mask=
-                                             block_all_but_the_Color08_parts)
-    Color09_parts_of_image = cv2.bitwise_or(Color09_paper, Color09_paper, mask=
-                                             block_all_but_the_Color09_parts)
-    Color10_parts_of_image = cv2.bitwise_or(Color10_paper, Color10_paper, mask=
-                                             block_all_but_the_Color10_parts)
-    
-    # Combine colored parts to create customized image
-    customized_image = cv2.add(Color01_parts_of_image,
-                               Color02_parts_of_image)
-    customized_image = cv2.add(customized_image, Color03_parts_of_image)
-    customized_image = cv2.add(customized_image, Color04_parts_of_image)
-    customized_image = cv2.add(customized_image, Color05_parts_of_image)
-    customized_image = cv2.add(customized_image, Color06_parts_of_image)
-    customized_image = cv2.add(customized_image, Color07_parts_of_image)
-    customized_image = cv2.add(customized_image, Color08_parts_of_image)
-    customized_image = cv2.add(customized_image, Color09_parts_of_image)
-    customized_image = cv2.add(customized_image, Color10_parts_of_image)
-
-    # Display original, grayscale, colored parts, and customized image.
-    cv2.imshow('Color01 Parts of Image', Color01_parts_of_image)
-    cv2.imshow('Color02 Parts of Image', Color02_parts_of_image)
-    cv2.imshow('Color03 Parts of Image', Color03_parts_of_image)
-    cv2.imshow('Color04 Parts of Image', Color04_parts_of_image)
-    cv2.imshow('Color05 Parts of Image', Color05_parts_of_image)
-    cv2.imshow('Color06 Parts of Image', Color06_parts_of_image)
-    cv2.imshow('Color07 Parts of Image', Color07_parts_of_image)
-    cv2.imshow('Color08 Parts of Image', Color08_parts_of_image)
-    cv2.imshow('Color09 Parts of Image', Color09_parts_of_image)
-    cv2.imshow('Color10 Parts of Image', Color10_parts_of_image)
-    cv2.imshow('Customized Image',customized_image)
-
-    # Give a delay to tell the computer to refresh the page.
-    keypressed = cv2.waitKey(1)
-
-# We are outside the loop now, so either "s" or "esc" was pressed.
-# Save images if "s" was pressed. Destroy all windows.
-if keypressed == ord('s'):
-    cv2.imwrite('photo_grayscale_1.jpg',grayscale_image)
-    cv2.imwrite('photo_customized_1.jpg',customized_image)
+
+# Function to color and save the image without opening any windows
+def render_without_gui(args, grayscale_image_simple):
+    breakpoints, palette, scheme_lut = trackbars.starting_bands(args, grayscale_image_simple)
+    if palette is None:
+        raise ValueError("Give --palette or --scheme to pick the colors.")
+    color_lut = scheme_lut if scheme_lut is not None else posterize.build_color_lut(breakpoints, palette)
+
+    extension = '.png' if args.format == 'indexed' else '.' + args.format
+    output_filename = args.output or output_writer.unique_filename('photo_customized', extension)
+    band_pool = posterize.create_band_pool(args.workers)
+    try:
+        if args.format == 'indexed' and output_filename.lower().endswith('.png'):
+            # Store each pixel's color number plus the palette instead of BGR.
+            label_map, indexed_palette = posterize.lut_to_indexed(grayscale_image_simple, color_lut, band_pool)
+            output_writer.write_indexed_png(output_filename, label_map, indexed_palette, args.png_compression)
+        else:
+            customized_image = posterize.apply_lut_banded(grayscale_image_simple, color_lut, band_pool)
+            if not cv2.imwrite(output_filename, customized_image,
+                               output_writer.encode_params(output_filename, args.png_compression,
+                                                           args.webp_quality)):
+                raise ValueError(f"Could not write {output_filename}.")
+    finally:
+        posterize.close_band_pool(band_pool)
+    print(f"Saved {output_filename}.")
+
+
+# Function to save the grayscale and customized images at full resolution
+# with the final trackbar settings
+def save_results(args, grayscale_image_simple, number_of_colors):
+    # Label the full-resolution image with the final trackbar settings, one
+    # band of rows per core.
+    final_breakpoints = trackbars.read_breakpoints(number_of_colors)
+    final_palette = posterize.as_palette(trackbars.read_palette(number_of_colors))
+    band_pool = posterize.create_band_pool(args.workers)
+    final_label_map = posterize.apply_lut_banded(grayscale_image_simple, posterize.build_label_lut(final_breakpoints),
+                                                 band_pool)
+
+    # Save in the background under names that do not overwrite earlier runs.
+    # Windows close while the files are still being written.
+    writer = output_writer.create_writer()
+    extension = '.png' if args.format == 'indexed' else '.' + args.format
+    customized_filename = args.output or output_writer.unique_filename('photo_customized', extension)
+    output_writer.submit_image(writer, output_writer.unique_filename('photo_grayscale', extension),
+                               grayscale_image_simple, png_compression=args.png_compression,
+                               webp_quality=args.webp_quality)
+    if args.format == 'indexed' and customized_filename.lower().endswith('.png'):
+        output_writer.submit_indexed_png(writer, customized_filename, final_label_map, final_palette,
+                                         args.png_compression)
+    else:
+        customized_image = posterize.apply_lut_banded(final_label_map, final_palette, band_pool)
+        output_writer.submit_image(writer, customized_filename, customized_image,
+                                   png_compression=args.png_compression, webp_quality=args.webp_quality)
+    posterize.close_band_pool(band_pool)
     cv2.destroyAllWindows()
-# WaitKey added for Macs to properly end program.
-cv2.waitKey(1)
\ No newline at end of file
+    for failed_filename, write_error in output_writer.close_writer(writer):
+        print(f"Could not save {failed_filename}: {write_error}")
+    for written_filename in writer['written']:
+        print(f"Saved {written_filename}.")
+
+
+# Function to show the windows and trackbars and run the loop until "s" or
+# "esc" is pressed
+def run_interactive(args, original_image, grayscale_image_simple, stacking_direction, breakpoints, palette=None):
+    # Number of grayscale bands, each with its own color. Any number from 2 to
+    # 256 works; every band gets a gs_break_* trackbar and a color window.
+    number_of_colors = len(breakpoints) + 1
+
+    # 'dashboard' shows all the images in one window instead of a window for
+    # each image.
+    use_dashboard = stacking_direction == 'dashboard'
+
+    if use_dashboard:
+        # Create one window for the images. The trackbars keep their own windows.
+        cv2.namedWindow(dashboard.DASHBOARD_WINDOW)
+        trackbars.create_trackbar_windows(number_of_colors)
+        board = dashboard.create_dashboard(['Original Image', 'Grayscale Image',
+                                            'Selected Band', 'Customized Image'])
+    else:
+        ## Create windows for display.
+        window_names = ['Original Image', 'Grayscale Image', trackbars.GRAYSCALE_WINDOW]
+        window_names += [trackbars.color_window(color_number) for color_number in range(1, number_of_colors + 1)]
+        window_names += [f'Color{color_number:02d} Parts of Image' for color_number in range(1, number_of_colors + 1)]
+        window_names += ['Customized Image']
+        for window_name in window_names:
+            cv2.namedWindow(window_name)
+
+        # Stack the windows horizontally or vertically
+        stack_windows(window_names, direction=stacking_direction)
+
+    # Build image pyramids so the trackbars can work on a small preview. The
+    # full-resolution image is only colored when the results are saved. Start
+    # on the coarsest level, which shows the whole image.
+    original_pyramid = preview.build_pyramid(original_image)
+    grayscale_pyramid = preview.build_pyramid(grayscale_image_simple)
+    preview_state = {'level': len(grayscale_pyramid) - 1, 'center': (0.5, 0.5),
+                     'origin': (0, 0), 'changed': True}
+
+    # Function for the mouse to center the preview on the clicked point of the
+    # customized image.
+    def recenter_preview(event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            if use_dashboard:
+                clicked_panel = dashboard.panel_at(board, x, y)
+                if clicked_panel is None or clicked_panel[0] != 'Customized Image':
+                    return
+                _, x, y = clicked_panel
+            preview_state['center'] = preview.center_from_click(
+                x, y, grayscale_pyramid[preview_state['level']], preview_state['origin'])
+            preview_state['changed'] = True
+
+    if use_dashboard:
+        cv2.setMouseCallback(dashboard.DASHBOARD_WINDOW, recenter_preview)
+    else:
+        cv2.setMouseCallback('Customized Image', recenter_preview)
+
+    # Keep track of which stages need to be redone. Moving a break point changes
+    # the band of each pixel, so the label map has to be rebuilt. Moving a color
+    # only changes the palette, so the label map can be recolored as it is.
+    dirty = {'labels': True, 'colors': True}
+
+    # Functions for the trackbars to mark what changed.
+    def mark_labels_dirty(position):
+        dirty['labels'] = True
+
+    def mark_colors_dirty(position):
+        dirty['colors'] = True
+
+    # Create grayscale and color trackbar(s), starting at the given bands.
+    trackbars.create_trackbars(mark_labels_dirty, mark_colors_dirty, number_of_colors, breakpoints)
+    if palette is not None:
+        trackbars.set_palette(palette)
+
+    # In the dashboard, a trackbar picks which color's parts of the image to show.
+    if use_dashboard:
+        cv2.createTrackbar('Band', dashboard.DASHBOARD_WINDOW, 0, number_of_colors - 1, mark_colors_dirty)
+
+    # The label map, customized image and parts of image are created when the
+    # preview is set up. The loop writes into them instead of making new images
+    # every time.
+    label_map = None
+
+    # Rendered label maps and customized images are kept in a cache with a
+    # memory budget, so going back to earlier settings does not recompute them.
+    # 'z' undoes and 'y' redoes the settings the trackbars stopped at.
+    rendered = render_cache.create_cache(args.cache_mb * 1024 * 1024)
+    history = render_cache.create_history()
+
+    # The histogram of the grayscale image is counted the first time automatic
+    # break points are asked for, then reused.
+    histogram = None
+
+    # Time every stage of the loop. The colors are only printed when they change.
+    frame_profiler = profiler.create_profiler()
+    show_stats = False
+    last_stats_time = 0.0
+    last_palette = None
+    first_frame_shown = False
+
+    # How long waitKey sleeps (in milliseconds) when nothing needs redrawing.
+    # Trackbar callbacks still run while waitKey is waiting.
+    idle_delay = 30
+
+    # Initialize while look control variable. Then start the loop.
+    keypressed = 1
+    while (keypressed != 27 and keypressed !=ord('s')):
+
+        # '+' zooms in to a finer pyramid level and '-' zooms back out.
+        if keypressed in (ord('+'), ord('=')) and preview_state['level'] > 0:
+            preview_state['level'] -= 1
+            preview_state['changed'] = True
+        elif keypressed == ord('-') and preview_state['level'] < len(grayscale_pyramid) - 1:
+            preview_state['level'] += 1
+            preview_state['changed'] = True
+
+        # 'p' turns the rolling log of stage times on and off. It prints at most
+        # once a second, also while the loop is idle. Allocations are only
+        # traced while the log is on.
+        if keypressed == ord('p'):
+            show_stats = not show_stats
+            if show_stats:
+                profiler.start_memory_trace(frame_profiler)
+            else:
+                profiler.stop_memory_trace(frame_profiler)
+        if show_stats and time.perf_counter() - last_stats_time >= 1.0:
+            print(profiler.format_summary(profiler.summary(frame_profiler)) + " | "
+                  + render_cache.format_cache(rendered))
+            last_stats_time = time.perf_counter()
+
+        # 'a' picks the break points automatically with multi-level Otsu and 'q'
+        # with equal-population quantiles. The trackbars are moved to match.
+        if keypressed in (ord('a'), ord('q')):
+            if histogram is None:
+                histogram = posterize.grayscale_histogram(grayscale_image_simple)
+            method = 'otsu' if keypressed == ord('a') else 'quantile'
+            trackbars.set_breakpoints(posterize.auto_breakpoints(histogram, number_of_colors, method))
+
+        # 'z' and 'y' move the trackbars to the previous or next settings. Those
+        # were rendered before, so they normally come straight from the cache.
+        if keypressed in (ord('z'), ord('y')):
+            state = render_cache.undo(history) if keypressed == ord('z') else render_cache.redo(history)
+            if state is not None:
+                trackbars.set_breakpoints(state[0])
+                trackbars.set_palette(state[1])
+
+        # Cut the preview out of the pyramid and display original and grayscale
+        # images. A new preview needs new labels.
+        if preview_state['changed']:
+            preview_state['changed'] = False
+            preview_grayscale, preview_state['origin'] = preview.viewport(
+                grayscale_pyramid[preview_state['level']], preview_state['center'])
+            preview_original, _ = preview.viewport(
+                original_pyramid[preview_state['level']], preview_state['center'])
+            if use_dashboard:
+                dashboard.draw_panel(board, 'Original Image', preview_original)
+                dashboard.draw_panel(board, 'Grayscale Image', preview_grayscale)
+            else:
+                cv2.imshow('Original Image', preview_original)
+                cv2.imshow('Grayscale Image', preview_grayscale)
+
+            preview_height, preview_width = preview_grayscale.shape
+            preview_key = (preview_state['level'], preview_state['origin'], preview_grayscale.shape)
+            if label_map is None or label_map.shape != preview_grayscale.shape:
+                label_map = numpy.zeros((preview_height, preview_width), numpy.uint8)
+                customized_image = numpy.zeros((preview_height, preview_width, 3), numpy.uint8)
+                parts_of_image = [numpy.zeros((preview_height, preview_width, 3), numpy.uint8)
+                                  for color_number in range(1, number_of_colors + 1)]
+            dirty['labels'] = True
+
+        # Nothing changed, so there is nothing to redraw. Remember the settings
+        # for undo, then sleep until the next key press or trackbar move. Idle
+        # time is not counted as frame time.
+        if not dirty['labels'] and not dirty['colors']:
+            render_cache.record_state(history, (tuple(breakpoints), tuple(tuple(color) for color in palette)))
+            keypressed = cv2.waitKey(idle_delay)
+            profiler.restart_frame(frame_profiler)
+            continue
+
+        if dirty['labels']:
+
+            # Define the break points between the grayscale bands, keeping them in
+            # order.
+            with profiler.stage(frame_profiler, 'trackbar read'):
+                breakpoints = trackbars.read_breakpoints(number_of_colors)
+
+            # Setting the trackbars above calls mark_labels_dirty again, but the
+            # break points read here are already the corrected ones.
+            dirty['labels'] = False
+
+            # Label every pixel with its band, unless these break points are in
+            # the cache. A new label map needs recoloring.
+            with profiler.stage(frame_profiler, 'mask build'):
+                labels_key = render_cache.label_key(preview_key, breakpoints)
+                if not render_cache.cache_get(rendered, labels_key, label_map):
+                    posterize.label_image(preview_grayscale, posterize.build_label_lut(breakpoints), out=label_map)
+                    render_cache.cache_put(rendered, labels_key, label_map)
+            dirty['colors'] = True
+
+        if dirty['colors']:
+            dirty['colors'] = False
+
+            # Define the colors of the papers as [Blue, Green, Red].
+            with profiler.stage(frame_profiler, 'trackbar read'):
+                palette = trackbars.read_palette(number_of_colors)
+
+            # Output the colors that changed to the Shell window
+            for color_number, color in enumerate(palette, start=1):
+                if last_palette is None or last_palette[color_number - 1] != color:
+                    blue, green, red = color
+                    print(f"Color {color_number:02d}: Blue={blue}, Green={green}, Red={red}")
+            last_palette = palette
+
+            # Color the whole preview with a single lookup, unless these settings
+            # are in the cache. The parts of the image come from the same label
+            # map.
+            with profiler.stage(frame_profiler, 'recolor'):
+                customized_key = render_cache.render_key(preview_key, breakpoints, palette)
+                if not render_cache.cache_get(rendered, customized_key, customized_image):
+                    posterize.apply_lut(label_map, posterize.as_palette(palette), out=customized_image)
+                    render_cache.cache_put(rendered, customized_key, customized_image)
+
+            # Display colored parts and customized image. The dashboard only
+            # needs the parts of the selected color.
+            if use_dashboard:
+                with profiler.stage(frame_profiler, 'composite'):
+                    selected_band = cv2.getTrackbarPos('Band', dashboard.DASHBOARD_WINDOW)
+                    posterize.band_parts(customized_image, label_map, selected_band,
+                                         out=parts_of_image[selected_band])
+                    dashboard.draw_panel(board, 'Selected Band', parts_of_image[selected_band])
+                    dashboard.draw_panel(board, 'Customized Image', customized_image)
+            else:
+                for color_number in range(1, number_of_colors + 1):
+                    with profiler.stage(frame_profiler, 'composite'):
+                        posterize.band_parts(customized_image, label_map, color_number - 1,
+                                             out=parts_of_image[color_number - 1])
+                    with profiler.stage(frame_profiler, 'imshow'):
+                        cv2.imshow(f'Color{color_number:02d} Parts of Image', parts_of_image[color_number - 1])
+                with profiler.stage(frame_profiler, 'imshow'):
+                    cv2.imshow('Customized Image',customized_image)
+
+        # Show every changed panel of the dashboard with a single imshow.
+        if use_dashboard:
+            with profiler.stage(frame_profiler, 'imshow'):
+                dashboard.show_dashboard(board)
+
+        # Give a delay to tell the computer to refresh the page.
+        with profiler.stage(frame_profiler, 'waitKey'):
+            keypressed = cv2.waitKey(1)
+        profiler.end_frame(frame_profiler)
+
+        if args.timing and not first_frame_shown:
+            print(f"First frame shown {(time.perf_counter() - START_TIME) * 1000:.0f} ms after start.")
+        first_frame_shown = True
+
+    # We are outside the loop now, so either "s" or "esc" was pressed.
+    # Save images if "s" was pressed. Destroy all windows.
+    if keypressed == ord('s'):
+        save_results(args, grayscale_image_simple, number_of_colors)
+    else:
+        cv2.destroyAllWindows()
+    # Save the stage times if they were being watched.
+    if show_stats:
+        profiler.export_json(frame_profiler)
+        profiler.export_csv(frame_profiler)
+        print("Render statistics saved to render_stats.json and render_stats.csv.")
+    # WaitKey added for Macs to properly end program.
+    cv2.waitKey(1)
+
+
+def parse_arguments(argv=None):
+    parser = argparse.ArgumentParser(description="Color the grayscale bands of an image.")
+    parser.add_argument('image', nargs='?', default=None, help="image to color (default: pick one in a dialog)")
+    parser.add_argument('--scheme', default=None, help="color scheme to start from (JSON or compiled .bin)")
+    parser.add_argument('--breakpoints', default=None, help="grayscale break points such as 50,85,127")
+    parser.add_argument('--palette', default=None, help="colors as B,G,R;B,G,R;... (one more than break points)")
+    parser.add_argument('--bands', type=int, default=trackbars.NUMBER_OF_COLORS,
+                        help="number of bands when no break points, palette or scheme are given")
+    parser.add_argument('--auto', choices=('otsu', 'quantile'), default=None,
+                        help="pick the break points automatically")
+    parser.add_argument('--output', default=None, help="file for the customized image (default: a new name)")
+    parser.add_argument('--format', choices=('indexed', 'png', 'webp', 'jpg'), default='indexed',
+                        help="how to save the results; 'indexed' is a palette PNG")
+    parser.add_argument('--png-compression', type=int, default=output_writer.DEFAULT_PNG_COMPRESSION,
+                        help="PNG compression level, 0 to 9")
+    parser.add_argument('--webp-quality', type=int, default=output_writer.DEFAULT_WEBP_QUALITY,
+                        help="WebP quality, 1 to 100")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="threads coloring the full-resolution image (default: all cores)")
+    parser.add_argument('--cache-mb', type=int, default=render_cache.DEFAULT_CACHE_BUDGET_MB,
+                        help="megabytes of rendered previews kept for undo and revisits")
+    parser.add_argument('--stacking', choices=('horizontal', 'vertical', 'dashboard'), default=None,
+                        help="window layout (default: dashboard, or ask when run without arguments)")
+    parser.add_argument('--no-gui', action='store_true', help="save the customized image without any windows")
+    parser.add_argument('--no-cache', action='store_true', help="decode the image again instead of using the cache")
+    parser.add_argument('--timing', action='store_true', help="print how long it took to the first output")
+    args = parser.parse_args(argv)
+    try:
+        output_writer.check_encoder_setting('png_compression', args.png_compression)
+        output_writer.check_encoder_setting('webp_quality', args.webp_quality)
+    except ValueError as setting_error:
+        parser.error(str(setting_error))
+    return parser, args
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    parser, args = parse_arguments(argv)
+    # Without any arguments the script asks its questions, as it always has.
+    ask_questions = not argv
+
+    if ask_questions:
+        args.scheme = color_scheme_prompts()
+
+    filename = args.image
+    if filename is None:
+        if args.no_gui:
+            parser.error("give the image to color when using --no-gui")
+        filename = choose_image_file()
+        if filename is None:
+            return 1
+
+    # Read in the original image once and take the grayscale image from it. The
+    # grayscale image keeps a single channel. Decoded images are cached, so
+    # opening the same file again skips decoding.
+    try:
+        original_image, grayscale_image_simple = ingest.load_image(filename, use_cache=not args.no_cache)
+    except (OSError, ValueError) as image_error:
+        print(f"Could not open image: {image_error}")
+        return 1
+
+    try:
+        if args.no_gui:
+            render_without_gui(args, grayscale_image_simple)
+            if args.timing:
+                print(f"Saved {(time.perf_counter() - START_TIME) * 1000:.0f} ms after start.")
+            return 0
+        breakpoints, palette, _ = trackbars.starting_bands(args, grayscale_image_simple)
+    except (OSError, ValueError) as settings_error:
+        print(f"Error: {settings_error}")
+        return 1
+
+    # Prompt user for stacking direction.
+    stacking_direction = args.stacking
+    if stacking_direction is None:
+        if ask_questions:
+            stacking_direction = input(
+                "How would you like to stack the windows? ('horizontal', 'vertical' or 'dashboard'): ").lower()
+        else:
+            stacking_direction = 'dashboard'
+    run_interactive(args, original_image, grayscale_image_simple, stacking_direction, breakpoints, palette)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,245 @@
+"Batch_Recolor_with_a_Saved_Color_Scheme"
+# Apply a saved color scheme (color_scheme.json) to every image in a directory
+# or glob without opening any windows. Images are spread over a pool of
+# worker processes. Only a limited number of images are in flight at once,
+# so memory stays flat on very large batches, and one bad file does not stop
+# the run, even if it crashes a worker process. A summary with images per second is printed at the end.
+#
+# Images found in subfolders keep their subfolder under the output
+# directory, and an image is never written over an input file.
+#
+# Example:
+#   python batch_recolor.py color_scheme.json photos/ --output-dir recolored
+
+# Import libraries
+import argparse
+import collections
+import concurrent.futures
+import glob
+import os
+import os.path
+import sys
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+import ingest
+import output_writer
+import posterize
+from color_scheme import load_compiled_scheme, scheme_problems, compiled_scheme_palette
+
+# File types picked up when the input is a directory.
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+# Lookup table for the color scheme, set once in every worker process. With
+# automatic break points, the scheme's colors and the method are kept instead
+# and a lookup table is made for each image.
+worker_lut = None
+worker_palette = None
+worker_method = None
+
+# How outputs are encoded: PNG compression, WebP quality, and whether PNGs are
+# saved as indexed-palette images.
+worker_write_options = {}
+
+
+# Function to list the images in a directory, or the files matching a glob
+def find_images(input_path):
+    if os.path.isdir(input_path):
+        filenames = [os.path.join(input_path, name) for name in os.listdir(input_path)]
+        filenames = [name for name in filenames if name.lower().endswith(IMAGE_EXTENSIONS)]
+    else:
+        filenames = glob.glob(input_path, recursive=True)
+    return sorted(name for name in filenames if os.path.isfile(name))
+
+
+# Function to find the folder all the images are in, so their paths below it
+# can be kept in the output directory
+def input_root(filenames):
+    return os.path.commonpath([os.path.dirname(os.path.abspath(filename)) for filename in filenames])
+
+
+# Function to pick where a recolored image is written: its path below the
+# input root, repeated below output_dir
+def output_path_for(filename, output_dir, extension=None, root=None):
+    if root is None:
+        root = os.path.dirname(os.path.abspath(filename))
+    stem, original_extension = os.path.splitext(os.path.relpath(os.path.abspath(filename), root))
+    return os.path.join(output_dir, stem + (extension or original_extension))
+
+
+# Function to pair every image with its output file. Images whose output
+# would overwrite an input file, or another image's output, are refused and
+# returned as failures instead.
+def plan_outputs(filenames, output_dir, extension=None):
+    root = input_root(filenames)
+    inputs = {os.path.realpath(filename) for filename in filenames}
+    planned = []
+    failures = []
+    taken = {}
+    for filename in filenames:
+        output_filename = output_path_for(filename, output_dir, extension, root)
+        output_key = os.path.realpath(output_filename)
+        if output_key in inputs:
+            failures.append((filename, f"output {output_filename} would overwrite an input image"))
+        elif output_key in taken:
+            failures.append((filename, f"output {output_filename} is already used by {taken[output_key]}"))
+        else:
+            taken[output_key] = filename
+            planned.append((filename, output_filename))
+    return planned, failures
+
+
+# Function run once in every worker to receive the color scheme lookup table
+def init_worker(scheme_lut, palette=None, method=None, write_options=None):
+    global worker_lut, worker_palette, worker_method, worker_write_options
+    worker_lut = scheme_lut
+    worker_palette = palette
+    worker_method = method
+    worker_write_options = write_options or {}
+    # Each process already gets its own core, so keep OpenCV single-threaded.
+    cv2.setNumThreads(1)
+
+
+# Function to recolor one image. Errors are returned instead of raised so a
+# single bad file is reported without stopping the batch.
+def recolor_file(filename, output_filename):
+    try:
+        # Same grayscale conversion as Art 7.py, so the posters match.
+        original_image, grayscale_image_simple = ingest.decode_image(filename)
+        del original_image
+        color_lut = worker_lut
+        if worker_method is not None:
+            # Place the scheme's colors on break points fitted to this image.
+            histogram = posterize.grayscale_histogram(grayscale_image_simple)
+            breakpoints = posterize.auto_breakpoints(histogram, len(worker_palette), worker_method)
+            color_lut = posterize.build_color_lut(breakpoints, worker_palette)
+        if worker_write_options.get('indexed') and output_filename.lower().endswith('.png'):
+            # Store each pixel's color number plus the palette instead of BGR.
+            label_map, indexed_palette = posterize.lut_to_indexed(grayscale_image_simple, color_lut)
+            png_compression = worker_write_options.get('png_compression', output_writer.DEFAULT_PNG_COMPRESSION)
+            output_writer.write_indexed_png(output_filename, label_map, indexed_palette, png_compression)
+            return filename, None
+        customized_image = posterize.apply_lut(grayscale_image_simple, color_lut)
+        params = output_writer.encode_params(output_filename, **{
+            name: value for name, value in worker_write_options.items() if name != 'indexed'})
+        if not cv2.imwrite(output_filename, customized_image, params):
+            return filename, f"could not write {output_filename}"
+    except Exception as recolor_error:
+        return filename, str(recolor_error)
+    return filename, None
+
+
+# Function to recolor a list of images on a process pool. At most
+# max_in_flight images are submitted but not yet finished at any time.
+def recolor_batch(filenames, scheme_lut, output_dir, workers=None, max_in_flight=None,
+                  extension=None, palette=None, method=None, write_options=None):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max_in_flight or workers * 2
+    planned, failures = plan_outputs(filenames, output_dir, extension)
+    for filename, error in failures:
+        print(f"Failed {filename}: {error}", file=sys.stderr)
+    for output_folder in sorted({os.path.dirname(output_filename) for filename, output_filename in planned}):
+        os.makedirs(output_folder, exist_ok=True)
+
+    done_count = len(failures)
+    start_time = time.perf_counter()
+    jobs = collections.deque(planned)
+    # Images that were in flight when a worker process died. Any of them
+    # may have killed it, so they are run again one at a time on a new pool;
+    # one that kills a worker on its own is recorded as failed.
+    suspects = collections.deque()
+
+    while jobs or suspects:
+        pool_broken = False
+        pending = {}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                                    initargs=(scheme_lut, palette, method, write_options)) as executor:
+            while True:
+                # Top up the pool, then wait for at least one image to finish.
+                while not pool_broken and (suspects or jobs) and len(pending) < (1 if suspects else max_in_flight):
+                    suspect = bool(suspects)
+                    job = (suspects if suspect else jobs).popleft()
+                    try:
+                        pending[executor.submit(recolor_file, *job)] = (job, suspect)
+                    except BrokenProcessPool:
+                        (suspects if suspect else jobs).appendleft(job)
+                        pool_broken = True
+                if not pending:
+                    break
+                finished, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in finished:
+                    job, suspect = pending.pop(future)
+                    try:
+                        filename, error = future.result()
+                    except BrokenProcessPool:
+                        pool_broken = True
+                        if not suspect:
+                            suspects.append(job)
+                            continue
+                        filename, error = job[0], "the worker process crashed"
+                    done_count += 1
+                    if error is not None:
+                        failures.append((filename, error))
+                        print(f"Failed {filename}: {error}", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start_time
+    return done_count, failures, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a saved color scheme to many images.")
+    parser.add_argument('scheme', help="color scheme saved by Art 7.py (JSON or compiled .bin)")
+    parser.add_argument('input', help="directory of images, or a glob such as 'photos/**/*.jpg'")
+    parser.add_argument('--output-dir', default='recolored', help="where recolored images are written")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--max-in-flight', type=int, default=None,
+                        help="images submitted but not finished at once (default: 2 x workers)")
+    parser.add_argument('--extension', default=None,
+                        help="output file type such as .png (default: same as input)")
+    parser.add_argument('--auto-breakpoints', choices=('otsu', 'quantile'), default=None,
+                        help="keep the scheme's colors but fit the break points to each image")
+    parser.add_argument('--png-compression', type=int, default=output_writer.DEFAULT_PNG_COMPRESSION,
+                        help="PNG compression level, 0 to 9")
+    parser.add_argument('--webp-quality', type=int, default=output_writer.DEFAULT_WEBP_QUALITY,
+                        help="WebP quality, 1 to 100")
+    parser.add_argument('--indexed', action='store_true',
+                        help="save PNG outputs as indexed-palette images (smaller and faster)")
+    parser.add_argument('--strict', action='store_true', help="refuse schemes with gaps or overlapping ranges")
+    args = parser.parse_args(argv)
+    # Bad encoder settings are refused once here, not once per image.
+    try:
+        output_writer.check_encoder_setting('png_compression', args.png_compression)
+        output_writer.check_encoder_setting('webp_quality', args.webp_quality)
+    except ValueError as setting_error:
+        parser.error(str(setting_error))
+
+    try:
+        compiled_scheme = load_compiled_scheme(args.scheme, strict=args.strict)
+    except (OSError, ValueError) as scheme_error:
+        print(f"Could not load color scheme: {scheme_error}")
+        return 1
+    for problem in scheme_problems(compiled_scheme):
+        print(f"Warning: {problem}")
+
+    filenames = find_images(args.input)
+    if not filenames:
+        print(f"No images found for {args.input}.")
+        return 1
+
+    done_count, failures, elapsed = recolor_batch(
+        filenames, compiled_scheme['lut'], args.output_dir, workers=args.workers,
+        max_in_flight=args.max_in_flight, extension=args.extension,
+        palette=compiled_scheme_palette(compiled_scheme), method=args.auto_breakpoints,
+        write_options={'indexed': args.indexed, 'png_compression': args.png_compression,
+                       'webp_quality': args.webp_quality})
+
+    images_per_second = done_count / elapsed if elapsed > 0 else 0.0
+    print(f"Recolored {done_count - len(failures)} of {done_count} images "
+          f"in {elapsed:.1f} s ({images_per_second:.1f} images/sec), {len(failures)} failed.")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
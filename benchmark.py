@@ -0,0 +1,298 @@
+"Benchmark_the_Posterization_Pipeline"
+# Time the original inRange / bitwise_or / add chain from Art 7.py against
+# the faster engines, on synthetic or real images from 0.3 MP to 100 MP and
+# with any number of bands. Every case runs in a fresh process so its peak
+# memory can be measured. Each engine's output is checked to be pixel-for-
+# pixel identical to the original chain. No windows or dialogs are opened,
+# so it runs on headless CI machines.
+#
+# Examples:
+#   python benchmark.py
+#   python benchmark.py --megapixels 1 12 50 --bands 10 32 --repeats 20 --json results.json
+#   python benchmark.py --image photo.jpg --megapixels 4 24
+#   python benchmark.py --engines lut threaded --megapixels 50 --workers 1 2 4 8 16
+#   python benchmark.py --startup --repeats 5
+
+# Import libraries
+import argparse
+import concurrent.futures
+import importlib.util
+import json
+import multiprocessing
+import os.path
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy
+
+import ingest
+import posterize
+
+try:
+    import resource
+except ImportError:
+    # The resource module only exists on Unix.
+    resource = None
+
+DEFAULT_MEGAPIXELS = (0.3, 1, 4, 12, 24, 50, 100)
+
+# Above this size the original chain is only timed on request, because it
+# keeps a colored paper and a mask for every band and needs tens of bytes per
+# pixel. The correctness check then uses a strip of rows, which is enough
+# since every pixel is colored on its own.
+DEFAULT_LEGACY_LIMIT_MP = 24
+CHECK_ROWS = 512
+
+# Rows of the synthetic test image made at a time.
+IMAGE_STRIP_ROWS = 256
+
+# Size of the synthetic photo used to time cold starts of Art 7.py.
+STARTUP_MEGAPIXELS = 12
+
+ART_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Art 7.py')
+
+
+# Function to run the original Art 7.py chain: an inRange mask, a colored
+# paper and a bitwise_or for every band, added together with cv2.add.
+def legacy_posterize(grayscale_image_simple, breakpoints, palette):
+    grayscale_image = cv2.cvtColor(grayscale_image_simple, cv2.COLOR_GRAY2BGR)
+    lower_limits = [0] + [breakpoint + 1 for breakpoint in breakpoints]
+    upper_limits = list(breakpoints) + [255]
+    customized_image = None
+    for lower, upper, color in zip(lower_limits, upper_limits, palette):
+        paper = numpy.zeros(grayscale_image.shape, numpy.uint8)
+        paper[:, :] = color
+        mask = cv2.inRange(grayscale_image, numpy.array([lower] * 3, numpy.uint8),
+                           numpy.array([min(upper, 255)] * 3, numpy.uint8))
+        parts_of_image = cv2.bitwise_or(paper, paper, mask=mask)
+        if customized_image is None:
+            customized_image = parts_of_image
+        else:
+            customized_image = cv2.add(customized_image, parts_of_image)
+    return customized_image
+
+
+# Thread pool of the 'threaded' engine, created in the process that runs the
+# case.
+band_pool = None
+
+
+# Function to run the lookup-table engine in row bands on the band pool
+def threaded_posterize(grayscale_image_simple, breakpoints, palette):
+    return posterize.posterize_banded(grayscale_image_simple, breakpoints, palette, band_pool)
+
+
+# Engines that can be benchmarked. Each takes (grayscale_image_simple,
+# breakpoints, palette) and returns the customized image.
+ENGINES = {
+    'legacy': legacy_posterize,
+    'lut': posterize.posterize,
+    'threaded': threaded_posterize,
+}
+
+
+# Function to get the peak resident memory of this process, in bytes
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+# Function to make a grayscale test image of about the given size. Without a
+# real image, a gradient with noise is used so every band gets pixels.
+def make_image(megapixels, image_filename=None, seed=0):
+    image_width = max(1, int(round((megapixels * 1e6 * 4 / 3) ** 0.5)))
+    image_height = max(1, int(round(megapixels * 1e6 / image_width)))
+    if image_filename:
+        grayscale_image_simple = ingest.decode_image(image_filename)[1]
+        return cv2.resize(grayscale_image_simple, (image_width, image_height), interpolation=cv2.INTER_LINEAR)
+    # The noise is made a strip of rows at a time, so no float copy of the
+    # whole image is held and the memory measured is the engine's own.
+    random_numbers = numpy.random.default_rng(seed)
+    gradient = numpy.linspace(0, 255, image_width, dtype=numpy.float32)[None, :]
+    grayscale_image_simple = numpy.empty((image_height, image_width), numpy.uint8)
+    for top in range(0, image_height, IMAGE_STRIP_ROWS):
+        bottom = min(top + IMAGE_STRIP_ROWS, image_height)
+        noise = random_numbers.normal(0, 20, (bottom - top, image_width)).astype(numpy.float32)
+        grayscale_image_simple[top:bottom] = numpy.clip(gradient + noise, 0, 255)
+    return grayscale_image_simple
+
+
+# Function to make evenly spaced break points and a random palette for a
+# number of bands
+def make_bands(number_of_bands, seed=0):
+    breakpoints = posterize.spread_breakpoints(numpy.linspace(0, 255, number_of_bands + 1)[1:-1])
+    random_numbers = numpy.random.default_rng(seed)
+    palette = random_numbers.integers(0, 256, (number_of_bands, 3)).tolist()
+    return breakpoints, palette
+
+
+# Function to benchmark one engine on one image size and band count. Runs in
+# its own process, so the peak memory belongs to this case only.
+def run_case(engine_name, megapixels, number_of_bands, repeats, image_filename, legacy_limit_mp, seed,
+             workers=None):
+    global band_pool
+    engine = ENGINES[engine_name]
+    if engine_name == 'threaded':
+        band_pool = posterize.create_band_pool(workers)
+    grayscale_image_simple = make_image(megapixels, image_filename, seed)
+    breakpoints, palette = make_bands(number_of_bands, seed)
+    baseline_rss = peak_rss_bytes()
+
+    result = {'engine': engine_name, 'megapixels': grayscale_image_simple.size / 1e6,
+              'bands': number_of_bands, 'repeats': repeats}
+    if band_pool is not None:
+        result['workers'] = band_pool['workers']
+    if engine_name == 'legacy' and megapixels > legacy_limit_mp:
+        result['skipped'] = f"larger than --legacy-limit {legacy_limit_mp} MP"
+        return result
+
+    # One warm-up run, which is also the output that gets checked.
+    customized_image = engine(grayscale_image_simple, breakpoints, palette)
+    latencies = []
+    for repeat in range(repeats):
+        start_time = time.perf_counter()
+        engine(grayscale_image_simple, breakpoints, palette)
+        latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+
+    def latency_ms(fraction):
+        return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] * 1000
+
+    result.update({
+        'p50_ms': latency_ms(0.50),
+        'p95_ms': latency_ms(0.95),
+        'p99_ms': latency_ms(0.99),
+        'megapixels_per_second': result['megapixels'] / (sum(latencies) / len(latencies)),
+        'peak_rss_bytes': peak_rss_bytes(),
+        'peak_rss_increase_bytes': (peak_rss_bytes() - baseline_rss) if baseline_rss is not None else None,
+    })
+
+    # Compare with the original chain, on a strip of rows for very big images.
+    if engine_name != 'legacy':
+        if megapixels > legacy_limit_mp:
+            check_rows = slice(0, CHECK_ROWS)
+            expected = legacy_posterize(grayscale_image_simple[check_rows], breakpoints, palette)
+            actual = customized_image[check_rows]
+        else:
+            expected = legacy_posterize(grayscale_image_simple, breakpoints, palette)
+            actual = customized_image
+        result['identical'] = bool(numpy.array_equal(expected, actual))
+    return result
+
+
+# Function to load Art 7.py as a module. Its file name has a space, so it
+# cannot be imported by name; loading it runs nothing but its definitions.
+def load_art_script():
+    spec = importlib.util.spec_from_file_location('art_7', ART_SCRIPT)
+    art_script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(art_script)
+    return art_script
+
+
+# Function to time cold starts of Art 7.py with --no-gui, from launching
+# Python to the saved file. The decode cache is skipped, so every run pays
+# for the full decode. Returns the sorted times in seconds.
+def time_startup(image_filename, runs, number_of_bands=10, seed=0):
+    breakpoints, palette = make_bands(number_of_bands, seed)
+    with tempfile.TemporaryDirectory() as scratch:
+        if image_filename is None:
+            image_filename = os.path.join(scratch, 'startup.png')
+            cv2.imwrite(image_filename, make_image(STARTUP_MEGAPIXELS, seed=seed))
+        command = [sys.executable, ART_SCRIPT, image_filename, '--no-gui', '--no-cache',
+                   '--breakpoints', ','.join(str(breakpoint) for breakpoint in breakpoints),
+                   '--palette', ';'.join(','.join(str(channel) for channel in color) for color in palette),
+                   '--output', os.path.join(scratch, 'customized.png')]
+        startup_times = []
+        for run in range(runs):
+            start_time = time.perf_counter()
+            subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+            startup_times.append(time.perf_counter() - start_time)
+    return sorted(startup_times)
+
+
+# Function to print one line of the results table
+def format_result(result):
+    engine_name = result['engine']
+    if 'workers' in result:
+        engine_name += f" x{result['workers']}"
+    text = f"{engine_name:>12} {result['megapixels']:8.1f} MP {result['bands']:4d} bands"
+    if 'skipped' in result:
+        return text + f"  skipped ({result['skipped']})"
+    text += (f"  p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  p99 {result['p99_ms']:9.2f} ms"
+             f"  {result['megapixels_per_second']:8.1f} MP/s")
+    if result['peak_rss_increase_bytes'] is not None:
+        text += f"  peak RSS {result['peak_rss_increase_bytes'] / 1e6:+9.1f} MB"
+    if 'identical' in result:
+        text += "  identical" if result['identical'] else "  MISMATCH"
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the posterization engines headless.")
+    parser.add_argument('--megapixels', type=float, nargs='+', default=list(DEFAULT_MEGAPIXELS),
+                        help="image sizes to test, in megapixels")
+    parser.add_argument('--bands', type=int, nargs='+', default=[10], help="band counts to test")
+    parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES),
+                        help="engines to test")
+    parser.add_argument('--workers', type=int, nargs='+', default=[None],
+                        help="thread counts for the 'threaded' engine (default: all cores)")
+    parser.add_argument('--repeats', type=int, default=10, help="timed runs per case")
+    parser.add_argument('--image', default=None, help="real image to resize to each size (default: synthetic)")
+    parser.add_argument('--legacy-limit', type=float, default=DEFAULT_LEGACY_LIMIT_MP,
+                        help="largest size in megapixels for timing the original chain")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the synthetic image and palette")
+    parser.add_argument('--json', default=None, help="also save the results to this JSON file")
+    parser.add_argument('--startup', action='store_true',
+                        help="time cold starts of Art 7.py --no-gui against its startup budget instead")
+    args = parser.parse_args(argv)
+
+    if args.startup:
+        budget = load_art_script().STARTUP_BUDGET_SECONDS
+        startup_times = time_startup(args.image, args.repeats, args.bands[0], args.seed)
+        median = startup_times[len(startup_times) // 2]
+        print(f"Cold start to saved file: median {median * 1000:.0f} ms, worst {startup_times[-1] * 1000:.0f} ms "
+              f"(budget {budget * 1000:.0f} ms)")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as file:
+                json.dump({'startup_seconds': startup_times, 'budget_seconds': budget}, file, indent=2)
+        if median > budget:
+            print("Cold start is over budget.")
+            return 1
+        return 0
+
+    results = []
+    mismatches = 0
+    # A fresh process for every case, so peak memory is not carried over.
+    process_context = multiprocessing.get_context('spawn')
+    for megapixels in args.megapixels:
+        for number_of_bands in args.bands:
+            # The threaded engine runs once for every thread count, to show
+            # how it scales.
+            cases = [(engine_name, workers) for engine_name in args.engines
+                     for workers in (args.workers if engine_name == 'threaded' else [None])]
+            for engine_name, workers in cases:
+                with concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=process_context) as executor:
+                    result = executor.submit(run_case, engine_name, megapixels, number_of_bands, args.repeats,
+                                             args.image, args.legacy_limit, args.seed, workers).result()
+                results.append(result)
+                print(format_result(result), flush=True)
+                if result.get('identical') is False:
+                    mismatches += 1
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"Results saved to {args.json}.")
+    if mismatches:
+        print(f"{mismatches} case(s) did not match the original chain.")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,243 @@
+"Saved color schemes for the grayscale band colorization"
+# A color scheme maps grayscale ranges to colors, for example
+# {(0, 50): [255, 0, 0], (51, 100): [0, 255, 0]}. It is saved as JSON with the
+# ranges written as strings like "(0, 50)", and turned back into tuples when
+# it is loaded so it can be applied outside the interactive session.
+#
+# For fast use a scheme is compiled: the ranges are checked, gaps and
+# overlaps between them are found, and a 256-entry lookup table is built so
+# applying the scheme is one gather however many ranges it has. Compiled
+# schemes are cached by the hash of the file they came from, and can be saved
+# in a compact binary form (see save_compiled_scheme).
+
+# Import libraries
+import ast
+import hashlib
+import json
+import os.path
+import struct
+import sys
+
+import cv2
+import numpy
+
+import posterize
+
+
+# Function to save the color scheme with stringified keys
+def save_color_scheme(current_color_scheme, file_path="color_scheme.json"):
+    # Convert tuple keys to strings
+    color_scheme_to_save = {str(k): v for k, v in current_color_scheme.items()}
+
+    try:
+        with open(file_path, 'w', encoding='utf-8') as file:
+            json.dump(color_scheme_to_save, file)
+        print(f"Color scheme saved to {file_path}.")
+    except Exception as e:
+        print(f"An error occurred while saving the color scheme: {e}")
+
+
+# Function to turn a stringified key like "(0, 50)" back into a (lower, upper)
+# tuple. Raises ValueError for anything that is not a pair of numbers.
+def parse_range(key):
+    try:
+        if isinstance(key, str):
+            key = ast.literal_eval(key)
+        lower, upper = (int(value) for value in key)
+    except (ValueError, TypeError, SyntaxError):
+        raise ValueError(f"Color scheme range {key!r} is not a (lower, upper) pair.") from None
+    return lower, upper
+
+
+# Function to load a saved color scheme
+def load_color_scheme(file_path="color_scheme.json", verbose=True):
+    if not os.path.exists(file_path):
+        if verbose:
+            print(f"No saved color scheme found at {file_path}.")
+        return None
+    with open(file_path, 'r', encoding='utf-8') as file:
+        loaded_color_scheme = json.load(file)
+    loaded_color_scheme = {parse_range(k): v for k, v in loaded_color_scheme.items()}
+    if verbose:
+        print(f"Color scheme loaded from {file_path}.")
+    return loaded_color_scheme
+
+
+# Function to build the 256-entry BGR lookup table for a color scheme. Gray
+# levels outside every range keep their own gray value. Later ranges win
+# where ranges overlap, the same as assigning them one after another.
+def build_scheme_lut(loaded_color_scheme):
+    scheme_lut = numpy.repeat(numpy.arange(256, dtype=numpy.uint8)[:, None], 3, axis=1)
+    for (lower, upper), color in loaded_color_scheme.items():
+        scheme_lut[max(lower, 0):min(upper, 255) + 1] = color
+    return scheme_lut
+
+
+# Start of a compiled scheme file, followed by the number of ranges.
+COMPILED_SCHEME_MAGIC = b'ARTSCHM1'
+
+# Compiled schemes by file hash, and how many to keep.
+compiled_scheme_cache = {}
+COMPILED_SCHEME_CACHE_SIZE = 128
+
+
+# Function to find the runs of True in a 256-entry array as (first, last)
+# grayscale levels
+def level_runs(levels):
+    runs = []
+    start = None
+    for level, inside in enumerate(levels):
+        if inside and start is None:
+            start = level
+        elif not inside and start is not None:
+            runs.append((start, level - 1))
+            start = None
+    if start is not None:
+        runs.append((start, len(levels) - 1))
+    return runs
+
+
+# Function to compile a color scheme. Every range and color is checked, and
+# a ValueError explains the first bad one. The result is a dictionary with
+# the ranges in file order, the 256-entry BGR lookup table, the gaps (levels
+# no range covers) and the overlaps (pairs of ranges sharing levels).
+def compile_color_scheme(loaded_color_scheme):
+    if not isinstance(loaded_color_scheme, dict):
+        raise ValueError(f"Color scheme must map ranges to colors, got {type(loaded_color_scheme).__name__}.")
+    if not loaded_color_scheme:
+        raise ValueError("Color scheme has no ranges.")
+
+    ranges = []
+    for key, color in loaded_color_scheme.items():
+        lower, upper = parse_range(key)
+        if not 0 <= lower <= upper <= 255:
+            raise ValueError(f"Color scheme range {key!r} must have 0 <= lower <= upper <= 255.")
+        try:
+            color = [int(value) for value in color]
+        except (ValueError, TypeError):
+            color = None
+        if color is None or len(color) != 3 or not all(0 <= value <= 255 for value in color):
+            raise ValueError(f"Color for range {key!r} must be three values from 0 to 255, "
+                             f"got {loaded_color_scheme[key]!r}.")
+        ranges.append(((lower, upper), color))
+
+    coverage = numpy.zeros(256, numpy.int32)
+    for (lower, upper), color in ranges:
+        coverage[lower:upper + 1] += 1
+
+    overlaps = []
+    for index, ((lower, upper), color) in enumerate(ranges):
+        for (other_lower, other_upper), other_color in ranges[index + 1:]:
+            if lower <= other_upper and other_lower <= upper:
+                overlaps.append(((lower, upper), (other_lower, other_upper)))
+
+    scheme_lut = build_scheme_lut(dict(ranges))
+    # Compiled schemes are shared through the cache, so the table is read-only.
+    scheme_lut.flags.writeable = False
+    return {
+        'ranges': ranges,
+        'lut': scheme_lut,
+        'gaps': level_runs(coverage == 0),
+        'overlaps': overlaps,
+    }
+
+
+# Function to describe the gaps and overlaps of a compiled scheme, one line each
+def scheme_problems(compiled_scheme):
+    problems = [f"Levels {lower}-{upper} are not in any range and stay gray."
+                for lower, upper in compiled_scheme['gaps']]
+    problems += [f"Ranges {first} and {second} overlap; the later one wins."
+                 for first, second in compiled_scheme['overlaps']]
+    return problems
+
+
+# Function to write a compiled scheme in the compact binary form: the magic
+# bytes, the number of ranges, 5 bytes per range (lower, upper, Blue, Green,
+# Red) and the 768-byte lookup table.
+def save_compiled_scheme(compiled_scheme, file_path="color_scheme.bin"):
+    data = COMPILED_SCHEME_MAGIC + struct.pack('<H', len(compiled_scheme['ranges']))
+    for (lower, upper), color in compiled_scheme['ranges']:
+        data += struct.pack('<5B', lower, upper, *color)
+    data += compiled_scheme['lut'].tobytes()
+    with open(file_path, 'wb') as file:
+        file.write(data)
+
+
+# Function to read the compact binary form back into a compiled scheme
+def decode_compiled_scheme(data):
+    offset = len(COMPILED_SCHEME_MAGIC)
+    if len(data) < offset + 2:
+        raise ValueError("Compiled color scheme file is the wrong size.")
+    (number_of_ranges,) = struct.unpack_from('<H', data, offset)
+    offset += 2
+    if len(data) != offset + 5 * number_of_ranges + 256 * 3:
+        raise ValueError("Compiled color scheme file is the wrong size.")
+    loaded_color_scheme = {}
+    for index in range(number_of_ranges):
+        lower, upper, blue, green, red = struct.unpack_from('<5B', data, offset + 5 * index)
+        loaded_color_scheme[(lower, upper)] = [blue, green, red]
+    compiled_scheme = compile_color_scheme(loaded_color_scheme)
+    stored_lut = numpy.frombuffer(data, numpy.uint8, 256 * 3, offset + 5 * number_of_ranges)
+    if not numpy.array_equal(stored_lut.reshape(256, 3), compiled_scheme['lut']):
+        raise ValueError("Compiled color scheme lookup table does not match its ranges.")
+    return compiled_scheme
+
+
+# Function to load and compile a color scheme from a JSON or compiled binary
+# file. The same file contents are only compiled once. With strict, a scheme
+# with gaps or overlaps is refused.
+def load_compiled_scheme(file_path="color_scheme.json", strict=False):
+    with open(file_path, 'rb') as file:
+        data = file.read()
+    file_hash = hashlib.sha256(data).hexdigest()
+
+    compiled_scheme = compiled_scheme_cache.get(file_hash)
+    if compiled_scheme is None:
+        if data.startswith(COMPILED_SCHEME_MAGIC):
+            compiled_scheme = decode_compiled_scheme(data)
+        else:
+            compiled_scheme = compile_color_scheme(json.loads(data.decode('utf-8')))
+        if len(compiled_scheme_cache) >= COMPILED_SCHEME_CACHE_SIZE:
+            # Forget the oldest compiled scheme.
+            del compiled_scheme_cache[next(iter(compiled_scheme_cache))]
+        compiled_scheme_cache[file_hash] = compiled_scheme
+
+    if strict and (compiled_scheme['gaps'] or compiled_scheme['overlaps']):
+        raise ValueError(f"Color scheme {file_path} has problems: " + ' '.join(scheme_problems(compiled_scheme)))
+    return compiled_scheme
+
+
+# Function to list the colors of a compiled scheme from darkest range to
+# lightest, for use as a band palette
+def compiled_scheme_palette(compiled_scheme):
+    return [color for (lower, upper), color in sorted(compiled_scheme['ranges'])]
+
+
+# Function to apply the loaded color scheme to the image. The scheme can be
+# a loaded scheme dictionary or a compiled scheme.
+def apply_color_scheme(image_local, loaded_color_scheme, out=None):
+    # Check if loaded_color_scheme is None before proceeding
+    if loaded_color_scheme is None:
+        raise ValueError("Loaded color scheme is None. Please check if the color scheme was loaded correctly.")
+    if 'lut' not in loaded_color_scheme:
+        loaded_color_scheme = compile_color_scheme(loaded_color_scheme)
+
+    # The ranges are grayscale levels, so color images are converted first.
+    if image_local.ndim == 3:
+        image_local = cv2.cvtColor(image_local, cv2.COLOR_BGR2GRAY)
+
+    # Apply color scheme with a single lookup
+    return posterize.apply_lut(image_local, loaded_color_scheme['lut'], out=out)
+
+
+# Compile a JSON scheme into the compact binary form from the command line:
+#   python color_scheme.py color_scheme.json color_scheme.bin
+if __name__ == '__main__':
+    if len(sys.argv) != 3:
+        print("Usage: python color_scheme.py SCHEME.json OUTPUT.bin")
+        sys.exit(2)
+    compiled_scheme = load_compiled_scheme(sys.argv[1])
+    for problem in scheme_problems(compiled_scheme):
+        print(problem)
+    save_compiled_scheme(compiled_scheme, sys.argv[2])
+    print(f"Compiled color scheme saved to {sys.argv[2]}.")
@@ -0,0 +1,86 @@
+"Single-window dashboard for the band colorization"
+# Instead of one HighGUI window per image, the images are drawn as panels on
+# one canvas that is allocated once and shown with a single imshow. Each
+# panel is scaled to fit its cell, keeping its shape. Only panels that were
+# given a new image are redrawn, and the canvas is only shown again when at
+# least one panel changed.
+
+# Import libraries
+import cv2
+import numpy
+
+DASHBOARD_WINDOW = 'Dashboard'
+
+
+# Function to create a dashboard with a cell for each panel name, filled in
+# rows of the given number of columns
+def create_dashboard(panel_names, columns=2, panel_width=400, panel_height=300):
+    rows = (len(panel_names) + columns - 1) // columns
+    dashboard = {
+        'canvas': numpy.zeros((rows * panel_height, columns * panel_width, 3), numpy.uint8),
+        'panel_width': panel_width,
+        'panel_height': panel_height,
+        'panels': {},
+        'changed': True,
+    }
+    for index, name in enumerate(panel_names):
+        dashboard['panels'][name] = {
+            'left': (index % columns) * panel_width,
+            'top': (index // columns) * panel_height,
+            'scale': 1.0,
+            'size': None,
+            'scratch': None,
+        }
+    return dashboard
+
+
+# Function to draw an image into its panel. The image is scaled into a
+# scratch buffer kept by the panel, then copied into the canvas.
+def draw_panel(dashboard, name, image):
+    panel = dashboard['panels'][name]
+    panel_width = dashboard['panel_width']
+    panel_height = dashboard['panel_height']
+    cell = dashboard['canvas'][panel['top']:panel['top'] + panel_height,
+                               panel['left']:panel['left'] + panel_width]
+
+    image_height, image_width = image.shape[:2]
+    scale = min(panel_width / image_width, panel_height / image_height)
+    size = (max(1, int(image_width * scale)), max(1, int(image_height * scale)))
+
+    # A new image size means a new scratch buffer and a cleared cell.
+    scratch_shape = (size[1], size[0]) + image.shape[2:]
+    if panel['scratch'] is None or panel['scratch'].shape != scratch_shape:
+        panel['scratch'] = numpy.zeros(scratch_shape, numpy.uint8)
+        cell[...] = 0
+    panel['scale'] = scale
+    panel['size'] = size
+
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_NEAREST
+    cv2.resize(image, size, dst=panel['scratch'], interpolation=interpolation)
+    target = cell[:size[1], :size[0]]
+    if panel['scratch'].ndim == 2:
+        target[...] = panel['scratch'][..., None]
+    else:
+        target[...] = panel['scratch']
+    cv2.putText(cell, name, (5, 15), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, cv2.LINE_AA)
+    dashboard['changed'] = True
+
+
+# Function to show the canvas, but only if a panel changed since last time
+def show_dashboard(dashboard, window_name=DASHBOARD_WINDOW):
+    if dashboard['changed']:
+        cv2.imshow(window_name, dashboard['canvas'])
+        dashboard['changed'] = False
+
+
+# Function to find which panel a click on the canvas landed in. Returns the
+# panel name and the click in the panel image's own pixels, or None.
+def panel_at(dashboard, x, y):
+    for name, panel in dashboard['panels'].items():
+        if panel['size'] is None:
+            continue
+        local_x = x - panel['left']
+        local_y = y - panel['top']
+        if 0 <= local_x < panel['size'][0] and 0 <= local_y < panel['size'][1]:
+            return name, int(local_x / panel['scale']), int(local_y / panel['scale'])
+    return None
@@ -0,0 +1,122 @@
+"Incremental recoloring of video frames and image sequences"
+# Frames from a still camera are mostly the same as the frame before. Each
+# grayscale frame is compared with the last one in square blocks, and only
+# the blocks that changed are looked up again. Everywhere else the last
+# output is reused as it is. Changing the lookup table (moving a trackbar)
+# redoes the whole frame.
+#
+# With a change threshold of 0 the result is exactly the same as coloring
+# every pixel. A small threshold ignores sensor noise: a block is only
+# redone once some pixel has drifted more than the threshold from the value
+# it was last colored with.
+#
+# Usage:
+#   tracker = incremental.create_tracker()
+#   customized_frame = incremental.recolor_incremental(tracker, grayscale_frame, color_lut)
+#   print(incremental.format_tracker(tracker))
+
+# Import libraries
+import cv2
+import numpy
+
+import posterize
+
+# Side of the square blocks that are compared, in pixels.
+DEFAULT_BLOCK_SIZE = 32
+
+# Largest change of a pixel (0-255) that does not count as a change.
+DEFAULT_CHANGE_THRESHOLD = 0
+
+
+# Function to create a tracker that remembers the last grayscale frame and
+# its output
+def create_tracker(block_size=DEFAULT_BLOCK_SIZE, change_threshold=DEFAULT_CHANGE_THRESHOLD):
+    return {
+        'block_size': block_size,
+        'change_threshold': change_threshold,
+        'previous': None,
+        'difference': None,
+        'output': None,
+        'lut': None,
+        'frames': 0,
+        'pixels': 0,
+        'recomputed_pixels': 0,
+        'last_fraction': 1.0,
+    }
+
+
+# Function to find which blocks changed since the last frame. Returns a
+# blocks-high x blocks-wide array of True/False.
+def changed_blocks(tracker, grayscale_frame):
+    block_size = tracker['block_size']
+    cv2.absdiff(grayscale_frame, tracker['previous'], dst=tracker['difference'])
+    # The biggest change in every block: first down each band of block rows,
+    # then across each block column. Whole block rows are reshaped so the
+    # maximum runs over contiguous rows; the shorter band at the bottom is
+    # done on its own. reduceat handles the narrower blocks at the right.
+    frame_height, frame_width = grayscale_frame.shape
+    full_rows = frame_height // block_size * block_size
+    row_maxima = [tracker['difference'][:full_rows].reshape(-1, block_size, frame_width).max(axis=1)]
+    if full_rows < frame_height:
+        row_maxima.append(tracker['difference'][full_rows:].max(axis=0, keepdims=True))
+    block_maxima = numpy.maximum.reduceat(numpy.concatenate(row_maxima),
+                                          numpy.arange(0, frame_width, block_size), axis=1)
+    return block_maxima > tracker['change_threshold']
+
+
+# Function to join neighbouring changed blocks of every block row into spans,
+# so each span is looked up with one call. Yields (top, bottom, left, right)
+# in pixels.
+def changed_spans(changed, block_size):
+    for block_row in numpy.flatnonzero(changed.any(axis=1)):
+        row = numpy.concatenate(([False], changed[block_row], [False]))
+        edges = numpy.flatnonzero(row[1:] != row[:-1])
+        for start, stop in zip(edges[0::2], edges[1::2]):
+            yield (block_row * block_size, (block_row + 1) * block_size, start * block_size, stop * block_size)
+
+
+# Function to color a grayscale frame through a lookup table, redoing only
+# the blocks that changed since the last frame. Returns the tracker's output,
+# which is overwritten by the next call; copy it to keep it.
+def recolor_incremental(tracker, grayscale_frame, lut):
+    output_shape = grayscale_frame.shape + lut.shape[1:]
+    full_frame = (tracker['previous'] is None or tracker['previous'].shape != grayscale_frame.shape
+                  or tracker['output'].shape != output_shape or lut is not tracker['lut'])
+
+    if full_frame:
+        if tracker['previous'] is None or tracker['previous'].shape != grayscale_frame.shape:
+            tracker['previous'] = numpy.empty_like(grayscale_frame)
+            tracker['difference'] = numpy.empty_like(grayscale_frame)
+        if tracker['output'] is None or tracker['output'].shape != output_shape:
+            tracker['output'] = numpy.empty(output_shape, lut.dtype)
+        tracker['lut'] = lut
+        numpy.copyto(tracker['previous'], grayscale_frame)
+        posterize.apply_lut(grayscale_frame, lut, out=tracker['output'])
+        recomputed_pixels = grayscale_frame.size
+    else:
+        recomputed_pixels = 0
+        for top, bottom, left, right in changed_spans(changed_blocks(tracker, grayscale_frame),
+                                                      tracker['block_size']):
+            grayscale_span = grayscale_frame[top:bottom, left:right]
+            posterize.apply_lut(grayscale_span, lut, out=tracker['output'][top:bottom, left:right])
+            # Remember what the span was colored from. Unchanged blocks keep
+            # their old values, so slow drift still adds up to a change.
+            tracker['previous'][top:bottom, left:right] = grayscale_span
+            recomputed_pixels += grayscale_span.size
+
+    tracker['frames'] += 1
+    tracker['pixels'] += grayscale_frame.size
+    tracker['recomputed_pixels'] += recomputed_pixels
+    tracker['last_fraction'] = recomputed_pixels / grayscale_frame.size
+    return tracker['output']
+
+
+# Function to get the fraction of all pixels so far that were recomputed
+def recomputed_fraction(tracker):
+    return tracker['recomputed_pixels'] / tracker['pixels'] if tracker['pixels'] else 0.0
+
+
+# Function to describe the tracker for the stats printed at the end
+def format_tracker(tracker):
+    return (f"recomputed {recomputed_fraction(tracker) * 100:.1f}% of pixels over {tracker['frames']} frames "
+            f"({tracker['block_size']} px blocks, threshold {tracker['change_threshold']})")
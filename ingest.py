@@ -0,0 +1,160 @@
+"Decode-once image loading with an on-disk cache"
+# Decode an image file once and take the single-channel grayscale plane from
+# the decoded color pixels, instead of decoding the file a second time as
+# grayscale. The decoded planes are cached on disk as .npy files, keyed by
+# the file's path, modification time and size. Opening the same image again
+# memory-maps the cached planes and skips the JPEG/PNG decode entirely.
+#
+# The cache has a size budget. Every use of an entry marks it as recently
+# used, and once the cache grows past its budget the least recently used
+# entries are deleted. Entries left behind by edited images are never used
+# again, so they are the first to go. Entries live in their own folder
+# inside the cache folder, and only folders that look like entries are ever
+# counted or deleted, so pointing ART_CACHE_DIR at a shared folder is safe.
+
+# Import libraries
+import hashlib
+import os
+import os.path
+import re
+import shutil
+import tempfile
+
+import cv2
+import numpy
+
+# Where decoded planes are cached unless told otherwise.
+DEFAULT_CACHE_DIR = os.environ.get(
+    'ART_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'art_posterize'))
+
+# Most bytes the cache may hold unless told otherwise (ART_CACHE_MB, in
+# megabytes). A 40 MP image takes about 160 MB.
+DEFAULT_CACHE_BUDGET_BYTES = int(os.environ.get('ART_CACHE_MB', 2048)) * 1024 * 1024
+
+# Folder inside the cache folder that holds the entries. Nothing outside it
+# is touched.
+ENTRIES_FOLDER = 'decoded_planes'
+
+# Files of a cache entry, and the form of an entry's folder name (its key).
+PLANE_FILENAMES = ('color.npy', 'grayscale.npy')
+ENTRY_NAME_PATTERN = re.compile(r'[0-9a-f]{40}')
+
+
+# Function to make the cache key for a file from its path, mtime and size.
+# Editing or replacing the file changes the key, so stale planes are never used.
+def cache_key(filename):
+    file_stat = os.stat(filename)
+    key_text = f"{os.path.abspath(filename)}|{file_stat.st_mtime_ns}|{file_stat.st_size}"
+    return hashlib.sha1(key_text.encode('utf-8')).hexdigest()
+
+
+# Function to write an array to a .npy file without ever leaving a half
+# written file behind for another session to pick up
+def save_plane(plane_filename, plane):
+    file_descriptor, temporary_filename = tempfile.mkstemp(
+        dir=os.path.dirname(plane_filename), suffix='.npy')
+    try:
+        with os.fdopen(file_descriptor, 'wb') as file:
+            numpy.save(file, plane)
+        os.replace(temporary_filename, plane_filename)
+    except BaseException:
+        os.remove(temporary_filename)
+        raise
+
+
+# Function to get the folder holding the entries of a cache
+def entries_dir(cache_dir):
+    return os.path.join(cache_dir, ENTRIES_FOLDER)
+
+
+# Function to check that a folder is a cache entry: named by a key and
+# holding at least one of the decoded planes
+def is_cache_entry(entry_dir):
+    if not ENTRY_NAME_PATTERN.fullmatch(os.path.basename(entry_dir)):
+        return False
+    return any(os.path.isfile(os.path.join(entry_dir, name)) for name in PLANE_FILENAMES)
+
+
+# Function to get the bytes used by every cache entry and when each was last
+# used. Returns a list of (last used, size, entry directory). Anything that
+# is not a cache entry is left out.
+def cache_entries(cache_dir):
+    entries = []
+    try:
+        entry_names = os.listdir(entries_dir(cache_dir))
+    except OSError:
+        return entries
+    for entry_name in entry_names:
+        entry_dir = os.path.join(entries_dir(cache_dir), entry_name)
+        if not is_cache_entry(entry_dir):
+            continue
+        try:
+            entry_size = sum(os.path.getsize(os.path.join(entry_dir, name)) for name in os.listdir(entry_dir))
+            entries.append((os.path.getmtime(entry_dir), entry_size, entry_dir))
+        except OSError:
+            # Deleted by another session meanwhile.
+            continue
+    return entries
+
+
+# Function to delete the least recently used entries until the cache fits
+# its budget. The entry in keep is never deleted.
+def prune_cache(cache_dir=DEFAULT_CACHE_DIR, budget_bytes=DEFAULT_CACHE_BUDGET_BYTES, keep=None):
+    entries = sorted(cache_entries(cache_dir))
+    total_size = sum(entry_size for last_used, entry_size, entry_dir in entries)
+    for last_used, entry_size, entry_dir in entries:
+        if total_size <= budget_bytes:
+            break
+        if entry_dir == keep:
+            continue
+        # Planes still memory-mapped by another session stay readable on
+        # Unix. Where deleting them fails, the entry is left for next time.
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        if not os.path.exists(entry_dir):
+            total_size -= entry_size
+    return total_size
+
+
+# Function to decode an image once, returning (original_image,
+# grayscale_image_simple). The grayscale plane stays single-channel.
+def decode_image(filename):
+    original_image = cv2.imread(filename, cv2.IMREAD_COLOR)
+    if original_image is None:
+        raise ValueError(f"Could not read image {filename}.")
+    grayscale_image_simple = cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
+    return original_image, grayscale_image_simple
+
+
+# Function to load an image through the decoded-plane cache. Cached planes
+# come back as read-only memory maps. Pass use_cache=False to always decode.
+# Images bigger than the whole budget are not cached.
+def load_image(filename, cache_dir=DEFAULT_CACHE_DIR, use_cache=True, cache_budget_bytes=DEFAULT_CACHE_BUDGET_BYTES):
+    if not use_cache:
+        return decode_image(filename)
+
+    entry_dir = os.path.join(entries_dir(cache_dir), cache_key(filename))
+    color_filename, grayscale_filename = (os.path.join(entry_dir, name) for name in PLANE_FILENAMES)
+
+    if os.path.exists(color_filename) and os.path.exists(grayscale_filename):
+        try:
+            cached_planes = (numpy.load(color_filename, mmap_mode='r'),
+                             numpy.load(grayscale_filename, mmap_mode='r'))
+            # Mark the entry as recently used.
+            os.utime(entry_dir)
+            return cached_planes
+        except (OSError, ValueError):
+            # A damaged cache entry is decoded again and overwritten.
+            pass
+
+    original_image, grayscale_image_simple = decode_image(filename)
+    if original_image.nbytes + grayscale_image_simple.nbytes > cache_budget_bytes:
+        return original_image, grayscale_image_simple
+    try:
+        os.makedirs(entry_dir, exist_ok=True)
+        save_plane(color_filename, original_image)
+        save_plane(grayscale_filename, grayscale_image_simple)
+        os.utime(entry_dir)
+        prune_cache(cache_dir, cache_budget_bytes, keep=entry_dir)
+    except OSError as cache_error:
+        print(f"Could not cache decoded image: {cache_error}")
+    return original_image, grayscale_image_simple
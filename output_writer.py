@@ -0,0 +1,174 @@
+"Background image writer with indexed-palette PNG output"
+# Save images on background threads so the caller does not wait for the
+# encoder. Only a few writes may be waiting at once; after that, submitting
+# blocks until one finishes, so memory stays bounded. PNG compression level,
+# WebP quality and JPEG quality can be chosen. File names can be made unique
+# so runs do not overwrite each other.
+#
+# Posterized images only use a handful of colors, so they can also be saved
+# as an indexed PNG: the band label map (one byte or less per pixel) plus a
+# palette of up to 256 colors. OpenCV cannot write palette PNGs, so those
+# are written here with zlib. With 16 colors or fewer the labels are packed
+# 2, 4 or 8 to a byte.
+
+# Import libraries
+import concurrent.futures
+import os
+import os.path
+import struct
+import threading
+import time
+import zlib
+
+import cv2
+import numpy
+
+# Default settings for each output format.
+DEFAULT_PNG_COMPRESSION = 3
+DEFAULT_WEBP_QUALITY = 90
+DEFAULT_JPEG_QUALITY = 95
+
+# Allowed values of the encoder settings, lowest and highest.
+ENCODER_SETTING_RANGES = {
+    'png_compression': (0, 9),
+    'webp_quality': (1, 100),
+    'jpeg_quality': (0, 100),
+}
+
+
+# Function to check that an encoder setting is a whole number in its allowed
+# range. Returns it as an int.
+def check_encoder_setting(name, value):
+    value = int(value)
+    lowest, highest = ENCODER_SETTING_RANGES[name]
+    if not lowest <= value <= highest:
+        raise ValueError(f"{name} must be from {lowest} to {highest}, got {value}.")
+    return value
+
+
+# Function to pick the cv2.imwrite parameters for a file type
+def encode_params(filename, png_compression=DEFAULT_PNG_COMPRESSION, webp_quality=DEFAULT_WEBP_QUALITY,
+                  jpeg_quality=DEFAULT_JPEG_QUALITY):
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, check_encoder_setting('png_compression', png_compression)]
+    if extension == '.webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, check_encoder_setting('webp_quality', webp_quality)]
+    if extension in ('.jpg', '.jpeg'):
+        return [cv2.IMWRITE_JPEG_QUALITY, check_encoder_setting('jpeg_quality', jpeg_quality)]
+    return []
+
+
+# Function to make a file name that is not used yet, like
+# photo_customized_20240901-153000.png, adding _2, _3, ... if needed
+def unique_filename(stem, extension, directory='.'):
+    timestamp = time.strftime('%Y%m%d-%H%M%S')
+    filename = os.path.join(directory, f"{stem}_{timestamp}{extension}")
+    counter = 2
+    while os.path.exists(filename):
+        filename = os.path.join(directory, f"{stem}_{timestamp}_{counter}{extension}")
+        counter += 1
+    return filename
+
+
+# Function to make one PNG chunk: length, type, data and CRC
+def png_chunk(chunk_type, data):
+    return (struct.pack('>I', len(data)) + chunk_type + data
+            + struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+
+# Function to encode a label map and its [Blue, Green, Red] palette as the
+# bytes of an indexed-color PNG. Labels must be smaller than the number of
+# colors.
+def indexed_png_bytes(label_map, palette, compression=DEFAULT_PNG_COMPRESSION):
+    palette = numpy.asarray(palette, dtype=numpy.uint8).reshape(-1, 3)
+    if not 1 <= len(palette) <= 256:
+        raise ValueError(f"Indexed PNG needs 1 to 256 colors, got {len(palette)}.")
+    compression = check_encoder_setting('png_compression', compression)
+    image_height, image_width = label_map.shape
+
+    # Use the fewest bits per pixel that hold every label.
+    bit_depth = 8
+    for bits in (1, 2, 4):
+        if len(palette) <= 1 << bits:
+            bit_depth = bits
+            break
+    pixels_per_byte = 8 // bit_depth
+    if pixels_per_byte > 1:
+        padded_width = -(-image_width // pixels_per_byte) * pixels_per_byte
+        padded = numpy.zeros((image_height, padded_width), numpy.uint8)
+        padded[:, :image_width] = label_map
+        rows = numpy.zeros((image_height, padded_width // pixels_per_byte), numpy.uint8)
+        for position in range(pixels_per_byte):
+            rows |= padded[:, position::pixels_per_byte] << (8 - bit_depth * (position + 1))
+    else:
+        rows = numpy.asarray(label_map, dtype=numpy.uint8)
+
+    # Every row starts with filter type 0 (no filter). Flat posterized areas
+    # compress well without one.
+    scanlines = numpy.zeros((image_height, rows.shape[1] + 1), numpy.uint8)
+    scanlines[:, 1:] = rows
+
+    header = struct.pack('>IIBBBBB', image_width, image_height, bit_depth, 3, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n'
+            + png_chunk(b'IHDR', header)
+            + png_chunk(b'PLTE', palette[:, ::-1].tobytes())
+            + png_chunk(b'IDAT', zlib.compress(scanlines.tobytes(), compression))
+            + png_chunk(b'IEND', b''))
+
+
+# Function to write a label map and its [Blue, Green, Red] palette as an
+# indexed-color PNG file
+def write_indexed_png(filename, label_map, palette, compression=DEFAULT_PNG_COMPRESSION):
+    data = indexed_png_bytes(label_map, palette, compression)
+    with open(filename, 'wb') as file:
+        file.write(data)
+
+
+# Function to create a background writer with a number of threads and a
+# limit on how many writes may be waiting at once
+def create_writer(workers=2, max_pending=4):
+    return {
+        'executor': concurrent.futures.ThreadPoolExecutor(max_workers=workers),
+        'slots': threading.BoundedSemaphore(max_pending),
+        'errors': [],
+        'written': [],
+    }
+
+
+# Function to run one write on the writer's threads. Blocks while the
+# writer already has max_pending writes waiting.
+def submit(writer, filename, write_function, *write_arguments):
+    writer['slots'].acquire()
+
+    def write():
+        try:
+            write_function(*write_arguments)
+            writer['written'].append(filename)
+        except Exception as write_error:
+            writer['errors'].append((filename, str(write_error)))
+        finally:
+            writer['slots'].release()
+
+    writer['executor'].submit(write)
+
+
+# Function to save an image in the background with cv2.imwrite. The image
+# must not be changed until the write is done.
+def submit_image(writer, filename, image, **format_options):
+    def write_image(filename, image, params):
+        if not cv2.imwrite(filename, image, params):
+            raise ValueError(f"Could not write {filename}.")
+    submit(writer, filename, write_image, filename, image, encode_params(filename, **format_options))
+
+
+# Function to save a label map and palette as an indexed PNG in the background
+def submit_indexed_png(writer, filename, label_map, palette, compression=DEFAULT_PNG_COMPRESSION):
+    submit(writer, filename, write_indexed_png, filename, label_map, palette, compression)
+
+
+# Function to wait for every write to finish. Returns the (filename, error)
+# pairs of writes that failed.
+def close_writer(writer):
+    writer['executor'].shutdown(wait=True)
+    return writer['errors']
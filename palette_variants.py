@@ -0,0 +1,108 @@
+"Compare_Many_Color_Schemes_on_One_Image"
+# Render one image with many saved color schemes at once. The image is
+# decoded once. The grayscale levels where any scheme changes color split
+# 0-255 into shared segments, so every pixel is labeled with its segment
+# just once. Every scheme is then only a small palette of segment colors,
+# and all the variants are filled by one batched gather into a preallocated
+# N x H x W x 3 buffer. The variants can be saved one file each, or side by
+# side on a contact sheet.
+#
+# Examples:
+#   python palette_variants.py photo.jpg schemes/*.json --output-dir variants
+#   python palette_variants.py photo.jpg a.json b.json c.bin --contact-sheet sheet.png --columns 3
+
+# Import libraries
+import argparse
+import os
+import os.path
+import sys
+
+import cv2
+import numpy
+
+import dashboard
+import ingest
+import posterize
+from color_scheme import load_compiled_scheme
+from posterize import shared_segments
+
+
+# Function to render a grayscale image through N 256-entry color lookup
+# tables. The segment label map is built once and all N outputs come from a
+# single gather. out, if given, must be an N x H x W x 3 uint8 array.
+# Segment labels are always inside every palette, so mode='clip' is safe and
+# lets numpy.take fill out directly instead of through a hidden copy.
+def render_variants(grayscale_image_simple, color_luts, out=None):
+    segment_lut, segment_palettes = shared_segments(color_luts)
+    label_map = posterize.label_image(grayscale_image_simple, segment_lut)
+    if out is None:
+        out = numpy.empty((len(segment_palettes),) + label_map.shape + (3,), numpy.uint8)
+    return numpy.take(segment_palettes, label_map, axis=1, out=out, mode='clip')
+
+
+# Function to name every variant after its scheme file. Schemes with the
+# same name (like a.json and a.bin) keep their extension to stay apart.
+def scheme_names(scheme_filenames):
+    names = [os.path.splitext(os.path.basename(scheme))[0] for scheme in scheme_filenames]
+    return [os.path.basename(scheme) if names.count(name) > 1 else name
+            for scheme, name in zip(scheme_filenames, names)]
+
+
+# Function to lay the variants out on a contact sheet, each scaled into a
+# panel named after its scheme
+def contact_sheet(variants, names, columns=4, panel_width=400, panel_height=300):
+    sheet = dashboard.create_dashboard(names, columns, panel_width, panel_height)
+    for name, variant in zip(names, variants):
+        dashboard.draw_panel(sheet, name, variant)
+    return sheet['canvas']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render one image with many color schemes in one pass.")
+    parser.add_argument('image', help="image to recolor")
+    parser.add_argument('schemes', nargs='+', help="color schemes saved by Art 7.py (JSON or compiled .bin)")
+    parser.add_argument('--output-dir', default=None, help="save every variant here, named after its scheme")
+    parser.add_argument('--extension', default='.png', help="file type of the saved variants")
+    parser.add_argument('--contact-sheet', default=None, help="save all variants side by side to this file")
+    parser.add_argument('--columns', type=int, default=4, help="variants per row on the contact sheet")
+    parser.add_argument('--panel-width', type=int, default=400, help="width of each contact sheet panel")
+    parser.add_argument('--panel-height', type=int, default=300, help="height of each contact sheet panel")
+    args = parser.parse_args(argv)
+    if not args.output_dir and not args.contact_sheet:
+        parser.error("give --output-dir, --contact-sheet or both")
+
+    try:
+        compiled_schemes = [load_compiled_scheme(scheme) for scheme in args.schemes]
+    except (OSError, ValueError) as scheme_error:
+        print(f"Could not load color scheme: {scheme_error}")
+        return 1
+    names = scheme_names(args.schemes)
+
+    try:
+        original_image, grayscale_image_simple = ingest.load_image(args.image)
+    except (OSError, ValueError) as image_error:
+        print(f"Could not open image: {image_error}")
+        return 1
+    variants = render_variants(grayscale_image_simple, [compiled['lut'] for compiled in compiled_schemes])
+
+    try:
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+            for name, variant in zip(names, variants):
+                variant_filename = os.path.join(args.output_dir, name + args.extension)
+                if not cv2.imwrite(variant_filename, variant):
+                    raise ValueError(f"Could not write {variant_filename}.")
+            print(f"Saved {len(variants)} variants to {args.output_dir}.")
+        if args.contact_sheet:
+            if not cv2.imwrite(args.contact_sheet, contact_sheet(variants, names, args.columns,
+                                                                 args.panel_width, args.panel_height)):
+                raise ValueError(f"Could not write {args.contact_sheet}.")
+            print(f"Contact sheet saved to {args.contact_sheet}.")
+    except (OSError, ValueError, cv2.error) as save_error:
+        print(f"Error: {save_error}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
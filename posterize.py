@@ -0,0 +1,264 @@
+"Posterization engine for the grayscale band colorization"
+# Split out of Art 7.py so the band/color work can be shared by other tools.
+# Every grayscale value 0-255 falls into exactly one band, so a whole frame
+# can be recolored with one lookup into a 256-entry table instead of building
+# a mask, a colored paper and an add for every band.
+
+# Import libraries
+import concurrent.futures
+import os
+
+import numpy
+
+# Default grayscale breakpoints, same as the trackbar defaults in Art 7.py.
+DEFAULT_BREAKPOINTS = (50, 85, 127, 170, 210, 230, 240, 245, 250)
+
+# Fewest and most bands. Band numbers have to fit in a uint8 label map.
+MIN_BANDS = 2
+MAX_BANDS = 256
+
+# Every grayscale level, used to build the lookup tables.
+GRAY_LEVELS = numpy.arange(256, dtype=numpy.int16)
+
+# Images with fewer rows than this per worker are colored on one thread,
+# since starting the bands would cost more than it saves.
+MIN_BAND_ROWS = 64
+
+
+# Function to get default break points for a number of bands: the trackbar
+# defaults for 10 bands, otherwise evenly spaced
+def default_breakpoints(number_of_bands=len(DEFAULT_BREAKPOINTS) + 1):
+    if number_of_bands == len(DEFAULT_BREAKPOINTS) + 1:
+        return list(DEFAULT_BREAKPOINTS)
+    return spread_breakpoints(numpy.linspace(0, 255, number_of_bands + 1)[1:-1])
+
+
+# Function to check the break points and return them as a sorted array.
+# There is one break point fewer than there are bands.
+def check_breakpoints(breakpoints):
+    breakpoints = numpy.asarray(breakpoints, dtype=numpy.int16).reshape(-1)
+    if not MIN_BANDS - 1 <= breakpoints.size <= MAX_BANDS - 1:
+        raise ValueError(f"Need between {MIN_BANDS - 1} and {MAX_BANDS - 1} break points, got {breakpoints.size}.")
+    if breakpoints.min() < 0 or breakpoints.max() > 255:
+        raise ValueError(f"Break points must be grayscale levels from 0 to 255, got {breakpoints.tolist()}.")
+    if (numpy.diff(breakpoints) < 0).any():
+        raise ValueError(f"Break points must be in increasing order, got {breakpoints.tolist()}.")
+    return breakpoints
+
+
+# Function to build the 256-entry band label table from the breakpoints.
+# Band 0 is [0, break_01], band 1 is [break_01+1, break_02], ... and the last
+# band is [break_last+1, 255], matching the inRange limits in Art 7.py.
+# All 256 levels are sorted into bands with one searchsorted, so the table
+# (and the single gather that uses it) costs the same for any band count.
+def build_label_lut(breakpoints):
+    breakpoints = check_breakpoints(breakpoints)
+    # A level belongs to the band after every breakpoint below it.
+    return numpy.searchsorted(breakpoints, GRAY_LEVELS, side='left').astype(numpy.uint8)
+
+
+# Function to turn a list of [Blue, Green, Red] colors into a palette array.
+# Every channel must be a value from 0 to 255.
+def as_palette(palette):
+    palette = numpy.asarray(palette, dtype=numpy.int64)
+    if palette.ndim != 2 or palette.shape[1] != 3:
+        raise ValueError(f"Palette must be a list of [Blue, Green, Red] colors, got shape {palette.shape}.")
+    if palette.size and (palette.min() < 0 or palette.max() > 255):
+        raise ValueError("Palette colors must be values from 0 to 255.")
+    return palette.astype(numpy.uint8)
+
+
+# Function to build the 256-entry BGR lookup table (one color per gray level)
+def build_color_lut(breakpoints, palette):
+    palette = as_palette(palette)
+    label_lut = build_label_lut(breakpoints)
+    if palette.shape[0] != len(breakpoints) + 1:
+        raise ValueError(f"Need {len(breakpoints) + 1} colors for {len(breakpoints)} breakpoints, got {palette.shape[0]}.")
+    return palette[label_lut]
+
+
+# Function to label every pixel of a single-channel image with its band number.
+# uint8 levels are always inside the 256-entry table, so mode='clip' is safe
+# and lets numpy.take write straight into out without a temporary copy.
+def label_image(grayscale_image_simple, label_lut, out=None):
+    return numpy.take(label_lut, grayscale_image_simple, out=out, mode='clip')
+
+
+# Function to color an image through a 256-entry lookup table in one gather.
+# Works for a grayscale image with a color LUT, or a label map with a palette.
+def apply_lut(index_image, lut, out=None):
+    return numpy.take(lut, index_image, axis=0, out=out, mode='clip')
+
+
+# Function to posterize a single-channel grayscale image in one pass
+def posterize(grayscale_image_simple, breakpoints, palette, out=None):
+    color_lut = build_color_lut(breakpoints, palette)
+    return apply_lut(grayscale_image_simple, color_lut, out=out)
+
+
+# Function to create a pool of threads for coloring images in row bands.
+# numpy.take lets go of the GIL, so the bands run on separate cores.
+def create_band_pool(workers=None):
+    workers = workers or os.cpu_count() or 1
+    return {'executor': concurrent.futures.ThreadPoolExecutor(max_workers=workers), 'workers': workers}
+
+
+# Function to stop the threads of a band pool
+def close_band_pool(band_pool):
+    band_pool['executor'].shutdown(wait=True)
+
+
+# Function to split image_height rows into one (top, bottom) band per worker
+def row_bands(image_height, workers):
+    workers = max(1, min(workers, image_height // MIN_BAND_ROWS))
+    edges = [image_height * band // workers for band in range(workers + 1)]
+    return list(zip(edges[:-1], edges[1:]))
+
+
+# Function to color an image through a lookup table like apply_lut, with
+# every worker of the band pool filling its own rows of out. The bands are
+# views of out, so nothing is copied or joined afterwards.
+def apply_lut_banded(index_image, lut, band_pool, out=None):
+    if out is None:
+        out = numpy.empty(index_image.shape + lut.shape[1:], lut.dtype)
+    bands = row_bands(index_image.shape[0], band_pool['workers'])
+    if len(bands) == 1:
+        return apply_lut(index_image, lut, out=out)
+    futures = [band_pool['executor'].submit(apply_lut, index_image[top:bottom], lut, out[top:bottom])
+               for top, bottom in bands]
+    for future in futures:
+        future.result()
+    return out
+
+
+# Function to posterize a grayscale image on all the workers of a band pool
+def posterize_banded(grayscale_image_simple, breakpoints, palette, band_pool, out=None):
+    color_lut = build_color_lut(breakpoints, palette)
+    return apply_lut_banded(grayscale_image_simple, color_lut, band_pool, out=out)
+
+
+# Function to find the segments of 0-255 on which every lookup table keeps
+# one color. Returns the level-to-segment table and an N x segments x 3
+# array with the color of every segment in every table.
+def shared_segments(color_luts):
+    color_luts = numpy.asarray(color_luts, dtype=numpy.uint8)
+    changes = (numpy.diff(color_luts.astype(numpy.int16), axis=1) != 0).any(axis=(0, 2))
+    segment_lut = numpy.concatenate(([0], numpy.cumsum(changes))).astype(numpy.uint8)
+    segment_starts = numpy.flatnonzero(numpy.concatenate(([True], changes)))
+    return segment_lut, numpy.ascontiguousarray(color_luts[:, segment_starts])
+
+
+# Function to split a 256-entry color lookup table into a label table and
+# the palette of colors it uses, for indexed output
+def indexed_lut(color_lut):
+    label_lut, segment_palettes = shared_segments([color_lut])
+    return label_lut, segment_palettes[0]
+
+
+# Function to turn a grayscale image and a color lookup table into a label
+# map and its palette, for indexed output. With a band pool, the labels are
+# made on all its workers.
+def lut_to_indexed(grayscale_image_simple, color_lut, band_pool=None):
+    label_lut, palette = indexed_lut(color_lut)
+    if band_pool is None:
+        return label_image(grayscale_image_simple, label_lut), palette
+    return apply_lut_banded(grayscale_image_simple, label_lut, band_pool), palette
+
+
+# Function to cut one band out of the customized image using the label map.
+# Pixels outside the band are black, like the old "Parts of Image" views.
+def band_parts(customized_image, label_map, band, out=None):
+    if out is None:
+        out = numpy.zeros_like(customized_image)
+    else:
+        out[...] = 0
+    numpy.copyto(out, customized_image, where=(label_map == band)[..., None])
+    return out
+
+
+
+# Function to count how many pixels have each grayscale level. Everything the
+# automatic break points need comes from these 256 counts, so the image is
+# only scanned once.
+def grayscale_histogram(grayscale_image_simple):
+    return numpy.bincount(numpy.asarray(grayscale_image_simple).reshape(-1), minlength=256)
+
+
+# Function to make break points strictly increasing and leave room for the
+# last band, so that every band keeps at least one grayscale level
+def spread_breakpoints(breakpoints):
+    breakpoints = [int(breakpoint) for breakpoint in breakpoints]
+    for index in range(len(breakpoints)):
+        lowest = breakpoints[index - 1] + 1 if index > 0 else 0
+        breakpoints[index] = max(breakpoints[index], lowest)
+    highest = 254
+    for index in reversed(range(len(breakpoints))):
+        breakpoints[index] = min(breakpoints[index], highest)
+        highest = breakpoints[index] - 1
+    return breakpoints
+
+
+# Function to pick break points that put the same number of pixels in every
+# band (equal-population quantiles of the histogram)
+def quantile_breakpoints(histogram, number_of_bands):
+    cumulative = numpy.cumsum(numpy.asarray(histogram, dtype=numpy.float64))
+    if cumulative[-1] == 0:
+        return spread_breakpoints(numpy.linspace(0, 255, number_of_bands + 1)[1:-1])
+    targets = cumulative[-1] * numpy.arange(1, number_of_bands) / number_of_bands
+    # The break point is the first level where the running count reaches the target.
+    return spread_breakpoints(numpy.searchsorted(cumulative, targets, side='left'))
+
+
+# Function to pick break points with multi-level Otsu: the split of the
+# histogram into bands that maximizes the variance between band means. It is
+# solved exactly by dynamic programming over the 256 histogram bins, never
+# touching the image.
+def otsu_breakpoints(histogram, number_of_bands):
+    histogram = numpy.asarray(histogram, dtype=numpy.float64)
+    weight = numpy.concatenate(([0.0], numpy.cumsum(histogram)))
+    moment = numpy.concatenate(([0.0], numpy.cumsum(histogram * numpy.arange(256))))
+
+    # score[start, end] is weight * mean**2 for a band holding the levels
+    # start to end-1. Empty or backwards bands are not allowed.
+    band_weight = weight[None, :] - weight[:, None]
+    band_moment = moment[None, :] - moment[:, None]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        score = numpy.where(band_weight > 0, band_moment ** 2 / band_weight, 0.0)
+    score[numpy.tril_indices(257)] = -numpy.inf
+
+    # best[end] is the best total score for the bands so far covering 0 to end-1.
+    best = score[0].copy()
+    band_starts = []
+    for band in range(1, number_of_bands):
+        candidates = best[:, None] + score
+        band_starts.append(numpy.argmax(candidates, axis=0))
+        best = candidates.max(axis=0)
+
+    # Walk back from the end of the histogram to recover the break points.
+    breakpoints = []
+    end = 256
+    for starts in reversed(band_starts):
+        start = int(starts[end])
+        breakpoints.append(start - 1)
+        end = start
+    return breakpoints[::-1]
+
+
+# Function to pick break points for a number of bands from a histogram, using
+# 'otsu' or 'quantile'
+def auto_breakpoints(histogram, number_of_bands, method='otsu'):
+    if method == 'otsu':
+        return otsu_breakpoints(histogram, number_of_bands)
+    if method == 'quantile':
+        return quantile_breakpoints(histogram, number_of_bands)
+    raise ValueError(f"Unknown break point method {method!r}, use 'otsu' or 'quantile'.")
+
+# Function to read break points typed on the command line, like "50,85,127"
+def parse_breakpoints(text):
+    return [int(value) for value in text.split(',') if value.strip()]
+
+
+# Function to read colors typed on the command line as [Blue, Green, Red],
+# like "255,0,0;0,255,0;0,0,255"
+def parse_palette(text):
+    return [[int(value) for value in color.split(',')] for color in text.split(';') if color.strip()]
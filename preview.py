@@ -0,0 +1,43 @@
+"Proxy preview for the interactive trackbar session"
+# The trackbar windows are only a few hundred pixels wide, so dragging a
+# slider does not need the full-resolution image. The preview works on an
+# image pyramid: level 0 is the full image and every level after it is half
+# the size. A viewport no bigger than the preview size is cut out of the
+# selected level. The coarsest level shows the whole image, and finer levels
+# show a zoomed-in region around a chosen center.
+
+# Import libraries
+import cv2
+
+# Largest preview shown while the trackbars are being moved.
+PREVIEW_WIDTH = 800
+PREVIEW_HEIGHT = 600
+
+
+# Function to build an image pyramid down to a level that fits the preview
+def build_pyramid(image, max_width=PREVIEW_WIDTH, max_height=PREVIEW_HEIGHT):
+    levels = [image]
+    while levels[-1].shape[1] > max_width or levels[-1].shape[0] > max_height:
+        levels.append(cv2.pyrDown(levels[-1]))
+    return levels
+
+
+# Function to cut the preview viewport out of one pyramid level. center is
+# the (x, y) middle of the viewport as a fraction of the image size. Returns
+# a view into the level (not a copy) and the (left, top) of the viewport.
+def viewport(level_image, center, max_width=PREVIEW_WIDTH, max_height=PREVIEW_HEIGHT):
+    level_height, level_width = level_image.shape[:2]
+    view_width = min(level_width, max_width)
+    view_height = min(level_height, max_height)
+    left = int(center[0] * level_width - view_width / 2)
+    top = int(center[1] * level_height - view_height / 2)
+    left = min(max(left, 0), level_width - view_width)
+    top = min(max(top, 0), level_height - view_height)
+    return level_image[top:top + view_height, left:left + view_width], (left, top)
+
+
+# Function to turn a click inside the viewport into a new center, as a
+# fraction of the image size
+def center_from_click(x, y, level_image, viewport_origin):
+    level_height, level_width = level_image.shape[:2]
+    return ((viewport_origin[0] + x) / level_width, (viewport_origin[1] + y) / level_height)
@@ -0,0 +1,160 @@
+"Per-stage timing and memory statistics for the render loop"
+# Time each stage of a frame (trackbar read, mask build, recolor, composite,
+# imshow, waitKey), keep the last few hundred frames in a rolling history,
+# and report frames per second and peak memory. The history can be saved as
+# JSON (summary and frames) or CSV (one row per frame).
+#
+# Usage:
+#   frame_profiler = profiler.create_profiler()
+#   with profiler.stage(frame_profiler, 'recolor'):
+#       ...
+#   profiler.end_frame(frame_profiler)
+
+# Import libraries
+import collections
+import contextlib
+import csv
+import json
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    # The resource module only exists on Unix.
+    resource = None
+
+# Stages of the render loop, in the order they run.
+STAGES = ('trackbar read', 'mask build', 'recolor', 'composite', 'imshow', 'waitKey')
+
+
+# Function to create a profiler keeping the last `history` frames. With
+# trace_memory, Python and NumPy allocations are traced to find the peak.
+# Tracing slows down every allocation, so it is off unless asked for; the
+# peak RSS of the process is reported either way.
+def create_profiler(history=300, trace_memory=False):
+    profiler = {
+        'frames': collections.deque(maxlen=history),
+        'current': {},
+        'frame_start': time.perf_counter(),
+        'frame_count': 0,
+        'trace_memory': False,
+    }
+    if trace_memory:
+        start_memory_trace(profiler)
+    return profiler
+
+
+# Function to start tracing allocations, for example when the stats are
+# turned on
+def start_memory_trace(profiler):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    profiler['trace_memory'] = True
+
+
+# Function to stop tracing allocations again
+def stop_memory_trace(profiler):
+    if profiler['trace_memory'] and tracemalloc.is_tracing():
+        tracemalloc.stop()
+    profiler['trace_memory'] = False
+
+
+# Function to time one stage of the current frame. Time spent in the same
+# stage more than once in a frame is added up.
+@contextlib.contextmanager
+def stage(profiler, name):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start_time
+        profiler['current'][name] = profiler['current'].get(name, 0.0) + elapsed
+
+
+# Function to finish the current frame and add it to the history
+def end_frame(profiler):
+    now = time.perf_counter()
+    frame = {'time': now, 'total': now - profiler['frame_start']}
+    frame.update(profiler['current'])
+    profiler['frames'].append(frame)
+    profiler['current'] = {}
+    profiler['frame_start'] = now
+    profiler['frame_count'] += 1
+
+
+# Function to forget the time spent idle, so the next frame only counts its
+# own work
+def restart_frame(profiler):
+    profiler['current'] = {}
+    profiler['frame_start'] = time.perf_counter()
+
+
+# Function to get the peak memory seen so far, in bytes
+def peak_memory(profiler):
+    memory = {}
+    if profiler['trace_memory'] and tracemalloc.is_tracing():
+        memory['peak_allocated_bytes'] = tracemalloc.get_traced_memory()[1]
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        memory['peak_rss_bytes'] = peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+    return memory
+
+
+# Function to get the value at a fraction of the way through sorted values
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+# Function to summarize the rolling history: frames per second, and the
+# mean, median, 95th percentile and worst time of every stage in milliseconds
+def summary(profiler):
+    frames = list(profiler['frames'])
+    result = {'frames': profiler['frame_count'], 'fps': 0.0, 'stages': {}}
+    if len(frames) > 1:
+        span = frames[-1]['time'] - frames[0]['time']
+        if span > 0:
+            result['fps'] = (len(frames) - 1) / span
+    for name in STAGES + ('total',):
+        times = sorted(frame.get(name, 0.0) * 1000 for frame in frames)
+        result['stages'][name] = {
+            'mean_ms': sum(times) / len(times) if times else 0.0,
+            'p50_ms': percentile(times, 0.50),
+            'p95_ms': percentile(times, 0.95),
+            'max_ms': times[-1] if times else 0.0,
+        }
+    result.update(peak_memory(profiler))
+    return result
+
+
+# Function to write the summary as one line of text for the rolling log
+def format_summary(stats):
+    stage_text = ', '.join(f"{name} {stats['stages'][name]['mean_ms']:.1f}" for name in STAGES)
+    text = f"{stats['fps']:.1f} fps | ms: {stage_text}"
+    if 'peak_allocated_bytes' in stats:
+        text += f" | peak {stats['peak_allocated_bytes'] / 1e6:.1f} MB"
+    elif 'peak_rss_bytes' in stats:
+        text += f" | peak RSS {stats['peak_rss_bytes'] / 1e6:.1f} MB"
+    return text
+
+
+# Function to save the summary and the per-frame history as JSON
+def export_json(profiler, file_path="render_stats.json"):
+    with open(file_path, 'w', encoding='utf-8') as file:
+        json.dump({'summary': summary(profiler), 'frames': list(profiler['frames'])}, file, indent=2)
+
+
+# Function to save the per-frame history as CSV, one row per frame and one
+# column per stage, in milliseconds
+def export_csv(profiler, file_path="render_stats.csv"):
+    columns = STAGES + ('total',)
+    with open(file_path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('frame',) + columns)
+        first_frame = profiler['frame_count'] - len(profiler['frames'])
+        for index, frame in enumerate(profiler['frames']):
+            writer.writerow([first_frame + index] + [f"{frame.get(name, 0.0) * 1000:.3f}" for name in columns])
@@ -0,0 +1,131 @@
+"Render cache and undo/redo history for the trackbar settings"
+# Keep recently rendered images so that going back to earlier trackbar
+# settings does not recompute them. Label maps are kept per set of break
+# points and customized images per set of break points and colors. The
+# least recently used images are dropped once the cache holds more than its
+# memory budget.
+#
+# The history remembers the settings the user stopped at, so undo and redo
+# can move the trackbars back and forth between them. Those settings were
+# rendered before, so they are usually still in the cache.
+
+# Import libraries
+import collections
+
+import numpy
+
+# Default memory budget of the render cache, in megabytes.
+DEFAULT_CACHE_BUDGET_MB = 256
+
+# Default number of settings remembered for undo.
+DEFAULT_HISTORY_LENGTH = 100
+
+
+# Function to create an empty cache holding at most memory_budget_bytes of
+# images
+def create_cache(memory_budget_bytes=DEFAULT_CACHE_BUDGET_MB * 1024 * 1024):
+    return {
+        'entries': collections.OrderedDict(),
+        'bytes': 0,
+        'budget': memory_budget_bytes,
+        'hits': 0,
+        'misses': 0,
+    }
+
+
+# Function to make the key of a label map: the preview it was made from and
+# the break points
+def label_key(preview_key, breakpoints):
+    return ('labels', preview_key, tuple(int(breakpoint) for breakpoint in breakpoints))
+
+
+# Function to make the key of a customized image: the preview, the break
+# points and the colors
+def render_key(preview_key, breakpoints, palette):
+    return ('render', preview_key, tuple(int(breakpoint) for breakpoint in breakpoints),
+            tuple(tuple(int(channel) for channel in color) for color in palette))
+
+
+# Function to copy a cached image into out. Returns False if the key is not
+# in the cache.
+def cache_get(cache, key, out):
+    cached = cache['entries'].get(key)
+    if cached is None or cached.shape != out.shape:
+        cache['misses'] += 1
+        return False
+    cache['entries'].move_to_end(key)
+    cache['hits'] += 1
+    numpy.copyto(out, cached)
+    return True
+
+
+# Function to get a cached image itself instead of a copy. Cached images are
+# read-only. Returns None if the key is not in the cache.
+def cache_find(cache, key):
+    cached = cache['entries'].get(key)
+    if cached is None:
+        cache['misses'] += 1
+        return None
+    cache['entries'].move_to_end(key)
+    cache['hits'] += 1
+    return cached
+
+
+# Function to store a copy of an image, dropping the least recently used
+# images until the cache fits its budget. Images larger than the whole
+# budget are not stored.
+def cache_put(cache, key, image):
+    if image.nbytes > cache['budget']:
+        return
+    if key in cache['entries']:
+        cache['bytes'] -= cache['entries'].pop(key).nbytes
+    cached = image.copy()
+    cached.flags.writeable = False
+    cache['entries'][key] = cached
+    cache['bytes'] += cached.nbytes
+    while cache['bytes'] > cache['budget']:
+        _, dropped = cache['entries'].popitem(last=False)
+        cache['bytes'] -= dropped.nbytes
+
+
+# Function to describe how well the cache is doing, for the stats log
+def format_cache(cache):
+    lookups = cache['hits'] + cache['misses']
+    hit_rate = cache['hits'] / lookups * 100 if lookups else 0.0
+    return (f"cache {len(cache['entries'])} images, {cache['bytes'] / 1e6:.1f} of "
+            f"{cache['budget'] / 1e6:.0f} MB, {hit_rate:.0f}% hits")
+
+
+# Function to create an empty undo/redo history
+def create_history(length=DEFAULT_HISTORY_LENGTH):
+    return {'states': collections.deque(maxlen=length), 'position': -1}
+
+
+# Function to add the settings the user stopped at. Settings equal to the
+# current ones are skipped. Anything that could be redone is forgotten.
+def record_state(history, state):
+    states = history['states']
+    if history['position'] >= 0 and states[history['position']] == state:
+        return
+    while len(states) > history['position'] + 1:
+        states.pop()
+    states.append(state)
+    history['position'] = len(states) - 1
+
+
+# Function to step back to the previous settings. Returns None if there are
+# none.
+def undo(history):
+    if history['position'] <= 0:
+        return None
+    history['position'] -= 1
+    return history['states'][history['position']]
+
+
+# Function to step forward to settings that were undone. Returns None if
+# there are none.
+def redo(history):
+    if history['position'] >= len(history['states']) - 1:
+        return None
+    history['position'] += 1
+    return history['states'][history['position']]
@@ -0,0 +1,342 @@
+"Local_Render_Service"
+# Keep Python, OpenCV and the decoded images loaded between renders. The
+# service listens on a local HTTP port or a Unix socket and answers render
+# requests with the encoded posterized image. Decoded grayscale planes and
+# label maps stay in memory in a render cache with a memory budget, and the
+# least recently used ones are dropped first. Compiled color schemes are kept
+# by color_scheme's own cache. Requests are served on separate threads; the
+# pixel work runs in NumPy and OpenCV, which let go of the GIL.
+#
+# Requests:
+#   GET  /health                          cache and request statistics (JSON)
+#   GET  /render?image=photo.jpg&breakpoints=60,120,180&palette=0,0,0;80,80,200;120,200,240;255,255,255
+#   GET  /render?image=photo.jpg&scheme=sunset&format=webp
+#   POST /render with a JSON body holding the same fields, or with the image
+#        file itself as the body and the other fields in the query string.
+#
+# format is 'indexed' (palette PNG, the default), 'png', 'webp' or 'jpg'.
+# png_compression, webp_quality and jpeg_quality can be given too.
+#
+# Examples:
+#   python render_service.py --port 8765 --scheme-dir schemes --preload photo.jpg
+#   python render_service.py --unix-socket /tmp/art_render.sock --image-root ~/Pictures
+#   curl --data-binary @photo.jpg "http://127.0.0.1:8765/render?scheme=sunset" -o poster.png
+
+# Import libraries
+import argparse
+import hashlib
+import http.server
+import json
+import os
+import os.path
+import socketserver
+import sys
+import threading
+import time
+import urllib.parse
+
+import cv2
+import numpy
+
+import ingest
+import output_writer
+import posterize
+import render_cache
+from color_scheme import load_compiled_scheme
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Default memory budget for decoded images and label maps, in megabytes.
+DEFAULT_CACHE_BUDGET_MB = 1024
+
+# Output formats, with their file extension and content type.
+OUTPUT_FORMATS = {
+    'indexed': ('.png', 'image/png'),
+    'png': ('.png', 'image/png'),
+    'webp': ('.webp', 'image/webp'),
+    'jpg': ('.jpg', 'image/jpeg'),
+}
+
+
+# Function to create the state shared by all requests: the render cache, the
+# lock guarding it, and where images and schemes may be read from
+def create_service(cache_budget_bytes=DEFAULT_CACHE_BUDGET_MB * 1024 * 1024, scheme_dir='.', image_root=None,
+                   disk_cache=False):
+    return {
+        'disk_cache': disk_cache,
+        'cache': render_cache.create_cache(cache_budget_bytes),
+        'lock': threading.Lock(),
+        'scheme_dir': scheme_dir,
+        'image_root': os.path.realpath(image_root) if image_root else None,
+        'requests': 0,
+        'errors': 0,
+        'started': time.time(),
+    }
+
+
+# Function to get an array from the render cache, or compute and cache it.
+# Returns the array and whether it came from the cache. Two requests missing
+# the same key at once both compute it; the later one replaces the first.
+def cached(service, key, compute):
+    with service['lock']:
+        found = render_cache.cache_find(service['cache'], key)
+    if found is not None:
+        return found, True
+    computed = compute()
+    with service['lock']:
+        render_cache.cache_put(service['cache'], key, computed)
+    return computed, False
+
+
+# Function to find an image file, refusing files outside image_root
+def resolve_image(service, image_path):
+    filename = os.path.realpath(os.path.expanduser(image_path))
+    if service['image_root'] and os.path.commonpath([filename, service['image_root']]) != service['image_root']:
+        raise PermissionError(f"Image {image_path} is outside the image root.")
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(f"Image {image_path} does not exist.")
+    return filename
+
+
+# Function to find a color scheme by name in scheme_dir, as given or with a
+# .bin or .json extension. Names cannot reach outside scheme_dir.
+def resolve_scheme(service, scheme_name):
+    if os.path.basename(scheme_name) != scheme_name or scheme_name in ('', '.', '..'):
+        raise ValueError(f"Color scheme name {scheme_name!r} must not contain a path.")
+    for extension in ('', '.bin', '.json'):
+        filename = os.path.join(service['scheme_dir'], scheme_name + extension)
+        if os.path.isfile(filename):
+            return filename
+    raise FileNotFoundError(f"Color scheme {scheme_name} not found in {service['scheme_dir']}.")
+
+
+# Function to get the grayscale plane of an image path or of encoded image
+# bytes, decoding it only if it is not in the cache. Returns the cache key of
+# the image and the plane.
+def load_grayscale(service, image_path=None, image_bytes=None):
+    if image_bytes:
+        image_key = ('image', hashlib.sha1(image_bytes).hexdigest())
+
+        def decode():
+            original_image = cv2.imdecode(numpy.frombuffer(image_bytes, numpy.uint8), cv2.IMREAD_COLOR)
+            if original_image is None:
+                raise ValueError("Could not decode the image in the request body.")
+            return cv2.cvtColor(original_image, cv2.COLOR_BGR2GRAY)
+    elif image_path:
+        filename = resolve_image(service, image_path)
+        image_key = ('image', ingest.cache_key(filename))
+
+        def decode():
+            return numpy.array(ingest.load_image(filename, use_cache=service['disk_cache'])[1])
+    else:
+        raise ValueError("Give an image path or send the image as the request body.")
+    grayscale_image_simple, _ = cached(service, image_key, decode)
+    return image_key, grayscale_image_simple
+
+
+# Function to read break points or a palette that came either as text (from
+# a query string) or as JSON lists
+def read_breakpoints_field(value):
+    return posterize.parse_breakpoints(value) if isinstance(value, str) else [int(item) for item in value]
+
+
+def read_palette_field(value):
+    palette = posterize.parse_palette(value) if isinstance(value, str) else value
+    return posterize.as_palette(palette)
+
+
+# Function to read the encoder settings of a request, checking that each is
+# a whole number in its allowed range
+def read_format_options(params):
+    return {name: output_writer.check_encoder_setting(name, params[name])
+            for name in output_writer.ENCODER_SETTING_RANGES if name in params}
+
+
+# Function to render one request. params holds image, breakpoints and
+# palette or scheme, format and the encoder settings. Returns the encoded
+# bytes, the content type and whether the label map was cached.
+def render(service, params, image_bytes=None):
+    output_format = params.get('format', 'indexed')
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(OUTPUT_FORMATS)}, got {output_format!r}.")
+    format_options = read_format_options(params)
+    image_key, grayscale_image_simple = load_grayscale(service, params.get('image'), image_bytes)
+
+    if params.get('scheme'):
+        # A scheme is split into the runs of gray levels that share a color,
+        # so it is labeled and encoded just like bands and a palette.
+        compiled_scheme = load_compiled_scheme(resolve_scheme(service, params['scheme']))
+        label_lut, palette = posterize.indexed_lut(compiled_scheme['lut'])
+        labels_key = ('scheme labels', image_key, label_lut.tobytes())
+    elif 'breakpoints' in params and 'palette' in params:
+        breakpoints = read_breakpoints_field(params['breakpoints'])
+        palette = read_palette_field(params['palette'])
+        if len(palette) != len(breakpoints) + 1:
+            raise ValueError(f"Need {len(breakpoints) + 1} colors for {len(breakpoints)} break points, "
+                             f"got {len(palette)}.")
+        label_lut = posterize.build_label_lut(breakpoints)
+        labels_key = render_cache.label_key(image_key, breakpoints)
+    else:
+        raise ValueError("Give either a scheme or both breakpoints and a palette.")
+
+    label_map, labels_cached = cached(service, labels_key,
+                                      lambda: posterize.label_image(grayscale_image_simple, label_lut))
+
+    extension, content_type = OUTPUT_FORMATS[output_format]
+    if output_format == 'indexed':
+        png_compression = format_options.get('png_compression', output_writer.DEFAULT_PNG_COMPRESSION)
+        data = output_writer.indexed_png_bytes(label_map, palette, png_compression)
+    else:
+        customized_image = posterize.apply_lut(label_map, palette)
+        encoded, buffer = cv2.imencode(extension, customized_image,
+                                       output_writer.encode_params(extension, **format_options))
+        if not encoded:
+            raise ValueError(f"Could not encode the image as {output_format}.")
+        data = buffer.tobytes()
+    return data, content_type, labels_cached
+
+
+# Function to report what the service has in memory and how busy it has been
+def health(service):
+    with service['lock']:
+        cache = service['cache']
+        return {
+            'uptime_seconds': time.time() - service['started'],
+            'requests': service['requests'],
+            'errors': service['errors'],
+            'cached_arrays': len(cache['entries']),
+            'cached_bytes': cache['bytes'],
+            'cache_budget_bytes': cache['budget'],
+            'cache_hits': cache['hits'],
+            'cache_misses': cache['misses'],
+        }
+
+
+# Request handler. Connections are kept open between requests so a frontend
+# does not pay for a new connection every render.
+class RenderHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.handle_request(None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.handle_request(self.rfile.read(length))
+
+    def handle_request(self, body):
+        service = self.server.service
+        url = urllib.parse.urlsplit(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        with service['lock']:
+            service['requests'] += 1
+
+        if url.path == '/health':
+            self.send_body(200, json.dumps(health(service)).encode('utf-8'), 'application/json')
+            return
+        if url.path != '/render':
+            self.send_error_body(404, f"Unknown path {url.path}.")
+            return
+
+        start_time = time.perf_counter()
+        image_bytes = None
+        try:
+            if body and self.headers.get('Content-Type', '').startswith('application/json'):
+                params.update(json.loads(body.decode('utf-8')))
+            elif body:
+                image_bytes = body
+            data, content_type, labels_cached = render(service, params, image_bytes)
+        except (FileNotFoundError, PermissionError) as request_error:
+            self.send_error_body(404 if isinstance(request_error, FileNotFoundError) else 403, str(request_error))
+            return
+        except (ValueError, TypeError, KeyError) as request_error:
+            self.send_error_body(400, str(request_error))
+            return
+        except Exception as render_error:
+            self.send_error_body(500, f"Render failed: {render_error}")
+            return
+        self.send_body(200, data, content_type, {
+            'X-Render-Ms': f"{(time.perf_counter() - start_time) * 1000:.2f}",
+            'X-Labels-Cached': 'yes' if labels_cached else 'no',
+        })
+
+    def send_body(self, status, data, content_type, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_body(self, status, message):
+        with self.server.service['lock']:
+            self.server.service['errors'] += 1
+        self.send_body(status, json.dumps({'error': message}).encode('utf-8'), 'application/json')
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix socket'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class UnixRenderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# Function to start the server on a Unix socket if one is given, otherwise
+# on host:port
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_socket=None, verbose=False):
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixRenderServer(unix_socket, RenderHandler)
+    else:
+        server = http.server.ThreadingHTTPServer((host, port), RenderHandler)
+    server.service = service
+    server.verbose = verbose
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve posterized renders from a resident process.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument('--unix-socket', default=None, help="listen on this Unix socket instead of a port")
+    parser.add_argument('--scheme-dir', default='.', help="directory holding the named color schemes")
+    parser.add_argument('--image-root', default=None, help="only serve image paths inside this directory")
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_BUDGET_MB,
+                        help="megabytes for decoded images and label maps")
+    parser.add_argument('--disk-cache', action='store_true',
+                        help="also keep decoded images in the on-disk cache shared with Art 7.py")
+    parser.add_argument('--preload', nargs='*', default=[], help="images to decode before serving")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    args = parser.parse_args(argv)
+
+    service = create_service(args.cache_mb * 1024 * 1024, args.scheme_dir, args.image_root, args.disk_cache)
+    for image_path in args.preload:
+        try:
+            load_grayscale(service, image_path)
+        except (OSError, ValueError) as preload_error:
+            print(f"Could not preload {image_path}: {preload_error}")
+
+    server = create_server(service, args.host, args.port, args.unix_socket, args.verbose)
+    where = args.unix_socket or f"http://{args.host}:{args.port}"
+    print(f"Render service listening on {where}. Press Ctrl+C to stop.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket and os.path.exists(args.unix_socket):
+            os.remove(args.unix_socket)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"Checks for compiling, saving and loading color schemes"
+# Run with: python -m pytest -q
+
+# Import libraries
+import json
+
+import numpy
+import pytest
+
+import color_scheme
+
+
+def test_touching_ranges_have_no_gaps_or_overlaps():
+    compiled_scheme = color_scheme.compile_color_scheme({(0, 127): [255, 0, 0], (128, 255): [0, 0, 255]})
+    assert compiled_scheme['gaps'] == []
+    assert compiled_scheme['overlaps'] == []
+    assert compiled_scheme['lut'][127].tolist() == [255, 0, 0]
+    assert compiled_scheme['lut'][128].tolist() == [0, 0, 255]
+
+
+def test_gaps_are_found_and_stay_gray():
+    compiled_scheme = color_scheme.compile_color_scheme({(10, 50): [255, 0, 0], (101, 200): [0, 255, 0]})
+    assert compiled_scheme['gaps'] == [(0, 9), (51, 100), (201, 255)]
+    assert compiled_scheme['lut'][75].tolist() == [75, 75, 75]
+    assert len(color_scheme.scheme_problems(compiled_scheme)) == 3
+
+
+def test_overlaps_are_found_and_the_later_range_wins():
+    compiled_scheme = color_scheme.compile_color_scheme(
+        {(0, 100): [255, 0, 0], (90, 255): [0, 255, 0], (95, 96): [0, 0, 255]})
+    assert compiled_scheme['overlaps'] == [((0, 100), (90, 255)), ((0, 100), (95, 96)), ((90, 255), (95, 96))]
+    assert compiled_scheme['lut'][92].tolist() == [0, 255, 0]
+    assert compiled_scheme['lut'][95].tolist() == [0, 0, 255]
+
+
+@pytest.mark.parametrize('loaded_color_scheme', [
+    [[0, 255], [1, 2, 3]],
+    {},
+    {'(0, 50': [1, 2, 3]},
+    {'5': [1, 2, 3]},
+    {'(1, 2, 3)': [1, 2, 3]},
+    {'(a, b)': [1, 2, 3]},
+    {'(50, 10)': [1, 2, 3]},
+    {'(0, 300)': [1, 2, 3]},
+    {'(0, 50)': [1, 2]},
+    {'(0, 50)': [1, 2, 256]},
+    {'(0, 50)': ['blue', 2, 3]},
+    {'(0, 50)': 7},
+])
+def test_malformed_schemes_raise_value_error(loaded_color_scheme):
+    with pytest.raises(ValueError):
+        color_scheme.compile_color_scheme(loaded_color_scheme)
+
+
+def test_compiled_scheme_round_trips_through_the_binary_form(tmp_path):
+    compiled_scheme = color_scheme.compile_color_scheme(
+        {(0, 50): [255, 0, 0], (40, 100): [0, 255, 0], (150, 255): [0, 0, 255]})
+    color_scheme.save_compiled_scheme(compiled_scheme, tmp_path / 'scheme.bin')
+
+    loaded = color_scheme.decode_compiled_scheme((tmp_path / 'scheme.bin').read_bytes())
+
+    assert loaded['ranges'] == compiled_scheme['ranges']
+    assert numpy.array_equal(loaded['lut'], compiled_scheme['lut'])
+    assert loaded['gaps'] == compiled_scheme['gaps']
+    assert loaded['overlaps'] == compiled_scheme['overlaps']
+
+
+@pytest.mark.parametrize('cut', [0, 8, 9, 20, -1])
+def test_truncated_binary_schemes_raise_value_error(cut):
+    compiled_scheme = color_scheme.compile_color_scheme({(0, 255): [1, 2, 3]})
+    data = (color_scheme.COMPILED_SCHEME_MAGIC + b'\x01\x00' + bytes([0, 255, 1, 2, 3])
+            + compiled_scheme['lut'].tobytes())
+    with pytest.raises(ValueError):
+        color_scheme.decode_compiled_scheme(data[:cut])
+
+
+def test_binary_scheme_with_a_wrong_table_is_refused():
+    compiled_scheme = color_scheme.compile_color_scheme({(0, 255): [1, 2, 3]})
+    data = bytearray(color_scheme.COMPILED_SCHEME_MAGIC + b'\x01\x00' + bytes([0, 255, 1, 2, 3])
+                     + compiled_scheme['lut'].tobytes())
+    data[-1] ^= 0xff
+    with pytest.raises(ValueError):
+        color_scheme.decode_compiled_scheme(bytes(data))
+
+
+def test_json_and_binary_files_load_to_the_same_scheme(tmp_path):
+    loaded_color_scheme = {(0, 99): [10, 20, 30], (100, 255): [40, 50, 60]}
+    json_path = tmp_path / 'scheme.json'
+    json_path.write_text(json.dumps({str(key): color for key, color in loaded_color_scheme.items()}))
+    from_json = color_scheme.load_compiled_scheme(str(json_path))
+    color_scheme.save_compiled_scheme(from_json, tmp_path / 'scheme.bin')
+    from_binary = color_scheme.load_compiled_scheme(str(tmp_path / 'scheme.bin'))
+    assert numpy.array_equal(from_json['lut'], from_binary['lut'])
+    assert from_binary['ranges'] == [((0, 99), [10, 20, 30]), ((100, 255), [40, 50, 60])]
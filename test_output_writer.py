@@ -0,0 +1,66 @@
+"Checks for the indexed-palette PNG writer"
+# Run with: python -m pytest -q
+
+# Import libraries
+import cv2
+import numpy
+import pytest
+
+import output_writer
+
+
+# Function to make a random label map and palette with a number of colors
+def random_labels(number_of_colors, image_height, image_width, seed=0):
+    random_numbers = numpy.random.default_rng(seed)
+    label_map = random_numbers.integers(0, number_of_colors, (image_height, image_width), dtype=numpy.uint8)
+    palette = random_numbers.integers(0, 256, (number_of_colors, 3), dtype=numpy.uint8)
+    return label_map, palette
+
+
+# Colors, and the bit depth the writer should pick for them.
+@pytest.mark.parametrize('number_of_colors, bit_depth', [(2, 1), (3, 2), (4, 2), (16, 4), (17, 8), (256, 8)])
+@pytest.mark.parametrize('image_width', [1, 7, 13, 33])
+def test_indexed_png_decodes_to_the_colored_image(tmp_path, number_of_colors, bit_depth, image_width):
+    label_map, palette = random_labels(number_of_colors, 5, image_width)
+    filename = tmp_path / 'indexed.png'
+
+    output_writer.write_indexed_png(str(filename), label_map, palette)
+
+    # The IHDR chunk holds the bit depth and color type 3 (palette).
+    data = filename.read_bytes()
+    assert data[24] == bit_depth
+    assert data[25] == 3
+    decoded = cv2.imread(str(filename), cv2.IMREAD_COLOR)
+    assert decoded is not None
+    assert numpy.array_equal(decoded, palette[label_map])
+
+
+def test_every_compression_level_decodes_the_same():
+    label_map, palette = random_labels(5, 9, 11)
+    for compression in range(10):
+        data = output_writer.indexed_png_bytes(label_map, palette, compression)
+        decoded = cv2.imdecode(numpy.frombuffer(data, numpy.uint8), cv2.IMREAD_COLOR)
+        assert numpy.array_equal(decoded, palette[label_map])
+
+
+@pytest.mark.parametrize('compression', [-1, 10, 99])
+def test_compression_out_of_range_raises_value_error(compression):
+    label_map, palette = random_labels(4, 3, 3)
+    with pytest.raises(ValueError):
+        output_writer.indexed_png_bytes(label_map, palette, compression)
+
+
+@pytest.mark.parametrize('number_of_colors', [0, 257])
+def test_palette_size_out_of_range_raises_value_error(number_of_colors):
+    with pytest.raises(ValueError):
+        output_writer.indexed_png_bytes(numpy.zeros((2, 2), numpy.uint8), numpy.zeros((number_of_colors, 3)))
+
+
+def test_encoder_settings_are_range_checked():
+    assert output_writer.encode_params('a.png', png_compression=9) == [cv2.IMWRITE_PNG_COMPRESSION, 9]
+    assert output_writer.encode_params('a.webp', webp_quality=1) == [cv2.IMWRITE_WEBP_QUALITY, 1]
+    assert output_writer.encode_params('a.tif') == []
+    with pytest.raises(ValueError):
+        output_writer.encode_params('a.webp', webp_quality=0)
+    with pytest.raises(ValueError):
+        output_writer.encode_params('a.jpg', jpeg_quality=101)
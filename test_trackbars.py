@@ -0,0 +1,41 @@
+"Regression checks for the break point trackbars"
+# Run with: python -m pytest -q
+
+# Import libraries
+import posterize
+import trackbars
+
+
+# Function to replace the HighGUI trackbar calls with a dictionary, so the
+# trackbars can be read and moved without any windows
+def fake_trackbars(monkeypatch, breakpoints):
+    positions = {f'gs_break_{break_number:02d}': breakpoint
+                 for break_number, breakpoint in enumerate(breakpoints, start=1)}
+    monkeypatch.setattr(trackbars.cv2, 'getTrackbarPos', lambda name, window: positions[name])
+    monkeypatch.setattr(trackbars.cv2, 'setTrackbarPos',
+                        lambda name, window, position: positions.__setitem__(name, position))
+    return positions
+
+
+def test_dragging_a_break_point_far_down_keeps_them_in_order(monkeypatch):
+    # gs_break_03 dragged from 127 to 40, below gs_break_01 and gs_break_02.
+    dragged = list(posterize.DEFAULT_BREAKPOINTS)
+    dragged[2] = 40
+    positions = fake_trackbars(monkeypatch, dragged)
+
+    breakpoints = trackbars.read_breakpoints(len(dragged) + 1)
+
+    assert breakpoints == sorted(breakpoints)
+    assert breakpoints[:3] == [38, 39, 40]
+    posterize.build_label_lut(breakpoints)
+    assert [positions[f'gs_break_{break_number:02d}'] for break_number in range(1, len(dragged) + 1)] == breakpoints
+
+
+def test_break_points_at_the_top_leave_a_level_for_every_band(monkeypatch):
+    fake_trackbars(monkeypatch, [255, 255, 255])
+    assert trackbars.read_breakpoints(4) == [252, 253, 254]
+
+
+def test_break_points_at_zero_stay_in_range(monkeypatch):
+    fake_trackbars(monkeypatch, [0, 0, 0])
+    assert trackbars.order_breakpoints([5, 3, 0], 4) == [0, 0, 0]
@@ -0,0 +1,166 @@
+"Tiled_Posterize_for_Very_Large_Images"
+# Posterize images that are too big to hold in memory several times over.
+# The grayscale plane is kept in a memory-mapped .npy file and the image is
+# colored one horizontal strip at a time, straight into a memory-mapped
+# output. The strip height is picked so the strip buffers fit inside a
+# memory budget, whatever the size of the image.
+#
+# .npy inputs (grayscale HxW or BGR HxWx3) are read strip by strip and never
+# loaded whole. Other image files still have to be decoded whole by OpenCV.
+# They are decoded straight to grayscale (1 byte per pixel), which is parked
+# in the memory-mapped scratch file right away.
+#
+# Examples:
+#   python tiled_posterize.py scan.tif scan_poster.npy --scheme color_scheme.json
+#   python tiled_posterize.py scan.npy scan_poster.png --breakpoints 60,120,180 \
+#       --palette "0,0,0;80,80,200;120,200,240;255,255,255" --memory-budget 128
+
+# Import libraries
+import argparse
+import os
+import os.path
+import sys
+import tempfile
+
+import cv2
+import numpy
+
+import posterize
+from color_scheme import load_compiled_scheme, scheme_problems
+
+# Default memory budget for the strip buffers, in megabytes.
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+
+# Function to open the input as a read-only memory map of its grayscale or
+# BGR pixels. Encoded images are decoded to grayscale into scratch_dir.
+def open_source(filename, scratch_dir):
+    if filename.lower().endswith('.npy'):
+        return numpy.load(filename, mmap_mode='r')
+
+    # Decoded straight to grayscale, so the full color image (3 bytes per
+    # pixel) is never held. The decoder's own conversion can put a few
+    # pixels one gray level away from Art 7.py's, which only matters for
+    # pixels right on a break point.
+    grayscale_image_simple = cv2.imread(filename, cv2.IMREAD_GRAYSCALE)
+    if grayscale_image_simple is None:
+        raise ValueError(f"Could not read image {filename}.")
+    scratch_filename = os.path.join(scratch_dir, 'grayscale.npy')
+    scratch = numpy.lib.format.open_memmap(scratch_filename, mode='w+', dtype=numpy.uint8,
+                                           shape=grayscale_image_simple.shape)
+    scratch[...] = grayscale_image_simple
+    scratch.flush()
+    del scratch, grayscale_image_simple
+    return numpy.load(scratch_filename, mmap_mode='r')
+
+
+# Function to pick how many rows go in one strip so that the input strip,
+# its grayscale plane and the colored output strip fit in the budget.
+def rows_per_strip(image_width, source_channels, memory_budget_bytes):
+    bytes_per_row = image_width * (source_channels + 1 + 3)
+    return max(1, memory_budget_bytes // bytes_per_row)
+
+
+# Function to posterize a memory-mapped source into a memory-mapped output,
+# one strip at a time. color_lut is a 256-entry BGR lookup table. With a
+# band pool, every strip is split into row bands colored on separate cores.
+def posterize_tiled(source, output, color_lut, memory_budget_bytes, band_pool=None):
+    image_height, image_width = source.shape[:2]
+    source_channels = source.shape[2] if source.ndim == 3 else 1
+    strip_rows = rows_per_strip(image_width, source_channels, memory_budget_bytes)
+
+    # Only color sources need a grayscale strip buffer. Grayscale sources are
+    # looked up straight from the memory map.
+    grayscale_strip = None
+    if source_channels != 1:
+        grayscale_strip = numpy.empty((min(strip_rows, image_height), image_width), numpy.uint8)
+
+    for top in range(0, image_height, strip_rows):
+        bottom = min(top + strip_rows, image_height)
+        source_strip = source[top:bottom]
+        if grayscale_strip is not None:
+            grayscale_rows = grayscale_strip[:bottom - top]
+            cv2.cvtColor(numpy.ascontiguousarray(source_strip), cv2.COLOR_BGR2GRAY, dst=grayscale_rows)
+            source_strip = grayscale_rows
+        if band_pool is None:
+            posterize.apply_lut(source_strip, color_lut, out=output[top:bottom])
+        else:
+            posterize.apply_lut_banded(source_strip, color_lut, band_pool, out=output[top:bottom])
+        # Write the finished strip back so its pages can be dropped.
+        output.flush()
+
+    return strip_rows
+
+
+# Function to posterize a file on disk into output_filename. A .npy output is
+# streamed strip by strip. Other formats are encoded from the memory-mapped
+# result, since OpenCV encoders need the whole image at once.
+def posterize_file(filename, output_filename, color_lut, memory_budget_bytes, scratch_dir=None, band_pool=None):
+    with tempfile.TemporaryDirectory(dir=scratch_dir) as scratch:
+        source = open_source(filename, scratch)
+        image_height, image_width = source.shape[:2]
+
+        if output_filename.lower().endswith('.npy'):
+            output_npy = output_filename
+        else:
+            output_npy = os.path.join(scratch, 'customized.npy')
+        output = numpy.lib.format.open_memmap(output_npy, mode='w+', dtype=numpy.uint8,
+                                              shape=(image_height, image_width, 3))
+
+        strip_rows = posterize_tiled(source, output, color_lut, memory_budget_bytes, band_pool)
+
+        if output_npy != output_filename:
+            if not cv2.imwrite(output_filename, output):
+                raise ValueError(f"Could not write {output_filename}.")
+        del output, source
+
+    return strip_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Posterize a very large image in strips.")
+    parser.add_argument('input', help="image file, or .npy array of grayscale or BGR pixels")
+    parser.add_argument('output', help="output file; .npy is written strip by strip")
+    parser.add_argument('--scheme', default=None, help="color scheme saved by Art 7.py (JSON or compiled .bin)")
+    parser.add_argument('--breakpoints', default=None, help="grayscale break points such as 50,85,127")
+    parser.add_argument('--palette', default=None, help="colors as B,G,R;B,G,R;... (one more than break points)")
+    parser.add_argument('--memory-budget', type=int, default=DEFAULT_MEMORY_BUDGET_MB,
+                        help="megabytes for the strip buffers")
+    parser.add_argument('--workers', type=int, default=None, help="threads coloring each strip (default: all cores)")
+    parser.add_argument('--scratch-dir', default=None, help="directory for the memory-mapped scratch files")
+    args = parser.parse_args(argv)
+
+    if args.scheme:
+        try:
+            compiled_scheme = load_compiled_scheme(args.scheme)
+        except (OSError, ValueError) as scheme_error:
+            print(f"Could not load color scheme: {scheme_error}")
+            return 1
+        for problem in scheme_problems(compiled_scheme):
+            print(f"Warning: {problem}")
+        color_lut = compiled_scheme['lut']
+    elif args.breakpoints and args.palette:
+        try:
+            color_lut = posterize.build_color_lut(posterize.parse_breakpoints(args.breakpoints),
+                                                  posterize.parse_palette(args.palette))
+        except ValueError as settings_error:
+            print(f"Error: {settings_error}")
+            return 1
+    else:
+        parser.error("give either --scheme or both --breakpoints and --palette")
+
+    band_pool = posterize.create_band_pool(args.workers)
+    try:
+        strip_rows = posterize_file(args.input, args.output, color_lut,
+                                    args.memory_budget * 1024 * 1024, args.scratch_dir, band_pool)
+    except (OSError, ValueError, cv2.error) as posterize_error:
+        print(f"Could not posterize {args.input}: {posterize_error}")
+        return 1
+    finally:
+        posterize.close_band_pool(band_pool)
+    print(f"Saved {args.output} ({strip_rows} rows per strip).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
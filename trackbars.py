@@ -0,0 +1,134 @@
+"Grayscale and color trackbars for the band colorization"
+# The nine gs_break_* trackbars live in the 'Grayscale Trackbars' window and
+# the Blue/Green/Red trackbars for each color in its own 'ColorNN Trackbars'
+# window. Shared by Art 7.py and the video tool so both use the same sliders.
+
+# Import libraries
+import cv2
+
+import posterize
+from color_scheme import load_compiled_scheme, scheme_problems, compiled_scheme_palette
+
+# Default number of grayscale bands (and colors) controlled by the trackbars.
+NUMBER_OF_COLORS = 10
+
+GRAYSCALE_WINDOW = 'Grayscale Trackbars'
+
+
+# Function to get the name of the trackbar window for a color (1 to 10)
+def color_window(color_number):
+    return f'Color{color_number:02d} Trackbars'
+
+
+# Function to create the trackbar windows
+def create_trackbar_windows(number_of_colors=NUMBER_OF_COLORS):
+    cv2.namedWindow(GRAYSCALE_WINDOW)
+    for color_number in range(1, number_of_colors + 1):
+        cv2.namedWindow(color_window(color_number))
+
+
+# Function to create the grayscale and color trackbars. The callbacks are
+# called with the new position whenever a break point or a color is moved.
+def create_trackbars(on_breakpoint_change, on_color_change, number_of_colors=NUMBER_OF_COLORS,
+                     breakpoints=None):
+    if breakpoints is None:
+        breakpoints = posterize.default_breakpoints(number_of_colors)
+    for break_number, breakpoint in enumerate(breakpoints, start=1):
+        cv2.createTrackbar(f'gs_break_{break_number:02d}', GRAYSCALE_WINDOW, breakpoint, 255, on_breakpoint_change)
+    for color_number in range(1, number_of_colors + 1):
+        cv2.createTrackbar(f'Blue_Color{color_number:02d}', color_window(color_number), 0, 255, on_color_change)
+        cv2.createTrackbar(f'Green_Color{color_number:02d}', color_window(color_number), 0, 255, on_color_change)
+        cv2.createTrackbar(f'Red_Color{color_number:02d}', color_window(color_number), 0, 255, on_color_change)
+
+
+# Function to put break points back in order. Break points that are too high
+# to leave a grayscale level for every band above are lowered first. Then,
+# going from the last break point down, a break point that passes the next
+# one is pulled back below it, so one drag can push several break points
+# down at once.
+def order_breakpoints(breakpoints, number_of_colors=NUMBER_OF_COLORS):
+    breakpoints = list(breakpoints)
+    for break_number in range(1, number_of_colors):
+        highest = 255 - (number_of_colors - break_number)
+        breakpoints[break_number - 1] = min(breakpoints[break_number - 1], highest)
+    for break_number in range(number_of_colors - 2, 0, -1):
+        if breakpoints[break_number - 1] > breakpoints[break_number]:
+            breakpoints[break_number - 1] = max(breakpoints[break_number] - 1, 0)
+    return breakpoints
+
+
+# Function to read the break points between the grayscale bands. Break points
+# that are out of order are corrected and the trackbars are moved to match.
+def read_breakpoints(number_of_colors=NUMBER_OF_COLORS):
+    read = []
+    for break_number in range(1, number_of_colors):
+        read.append(cv2.getTrackbarPos(f'gs_break_{break_number:02d}', GRAYSCALE_WINDOW))
+
+    breakpoints = order_breakpoints(read, number_of_colors)
+    for break_number, (old, new) in enumerate(zip(read, breakpoints), start=1):
+        if old != new:
+            cv2.setTrackbarPos(f'gs_break_{break_number:02d}', GRAYSCALE_WINDOW, new)
+    return breakpoints
+
+
+# Function to read the colors of the papers as [Blue, Green, Red].
+def read_palette(number_of_colors=NUMBER_OF_COLORS):
+    palette = []
+    for color_number in range(1, number_of_colors + 1):
+        palette.append([
+            cv2.getTrackbarPos(f'Blue_Color{color_number:02d}', color_window(color_number)),
+            cv2.getTrackbarPos(f'Green_Color{color_number:02d}', color_window(color_number)),
+            cv2.getTrackbarPos(f'Red_Color{color_number:02d}', color_window(color_number))])
+    return palette
+
+
+# Function to move the gs_break_* trackbars to new break points
+def set_breakpoints(breakpoints):
+    for break_number, breakpoint in enumerate(breakpoints, start=1):
+        cv2.setTrackbarPos(f'gs_break_{break_number:02d}', GRAYSCALE_WINDOW, int(breakpoint))
+
+
+# Function to move the Blue/Green/Red trackbars to a new palette
+def set_palette(palette):
+    for color_number, (blue, green, red) in enumerate(palette, start=1):
+        cv2.setTrackbarPos(f'Blue_Color{color_number:02d}', color_window(color_number), int(blue))
+        cv2.setTrackbarPos(f'Green_Color{color_number:02d}', color_window(color_number), int(green))
+        cv2.setTrackbarPos(f'Red_Color{color_number:02d}', color_window(color_number), int(red))
+
+
+# Function to work out the starting bands from the --scheme, --palette,
+# --breakpoints, --auto and --bands arguments. --auto picks the break points
+# from grayscale_image_simple. Returns the break points, the palette (None if
+# no colors were given) and the scheme's own color lookup table when the
+# scheme is used unchanged (else None).
+def starting_bands(args, grayscale_image_simple):
+    breakpoints = None
+    palette = None
+    scheme_lut = None
+    if args.scheme:
+        compiled_scheme = load_compiled_scheme(args.scheme)
+        for problem in scheme_problems(compiled_scheme):
+            print(f"Warning: {problem}")
+        # The scheme's ranges become the bands: each range ends at a break
+        # point and keeps its color.
+        palette = compiled_scheme_palette(compiled_scheme)
+        breakpoints = [upper for (lower, upper), color in sorted(compiled_scheme['ranges'])][:-1]
+        if not (args.breakpoints or args.palette or args.auto):
+            scheme_lut = compiled_scheme['lut']
+    if args.palette:
+        palette = posterize.parse_palette(args.palette)
+    number_of_bands = len(palette) if palette else args.bands
+
+    if args.breakpoints:
+        breakpoints = posterize.parse_breakpoints(args.breakpoints)
+    elif args.auto:
+        histogram = posterize.grayscale_histogram(grayscale_image_simple)
+        breakpoints = posterize.auto_breakpoints(histogram, number_of_bands, args.auto)
+    elif breakpoints is None or len(breakpoints) != number_of_bands - 1:
+        breakpoints = posterize.default_breakpoints(number_of_bands)
+    breakpoints = posterize.check_breakpoints(breakpoints).tolist()
+
+    if palette is not None and len(palette) != len(breakpoints) + 1:
+        raise ValueError(f"Need {len(breakpoints) + 1} colors for {len(breakpoints)} break points, "
+                         f"got {len(palette)}.")
+    return breakpoints, palette, scheme_lut
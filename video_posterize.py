@@ -0,0 +1,323 @@
+"Video_Grayscale_and_Color_Trackbars"
+# Run the grayscale band colorization from Art 7.py on a video file or a
+# camera, show it live and optionally save it with cv2.VideoWriter. The same
+# gs_break_* and color trackbars stay live while the video plays.
+#
+# The work is split over threads joined by small queues:
+#   capture thread -> process thread -> main thread (display) -> writer thread
+# Frames live in a small pool of buffers that is allocated once. Only the
+# pool index travels through the queues, so nothing is copied or allocated
+# per frame. When processing falls behind a live camera, the oldest waiting
+# frame is dropped instead of letting a backlog build up.
+#
+# With --incremental, each frame is compared with the one before in blocks
+# and only the blocks that changed are colored again (see incremental.py),
+# which saves most of the work on footage from a still camera.
+#
+# Examples:
+#   python video_posterize.py 0                        (first camera)
+#   python video_posterize.py clip.mp4 --output out.mp4
+#   python video_posterize.py clip.mp4 --no-display --scheme color_scheme.json --output out.mp4
+#   python video_posterize.py burst/img_%04d.png --incremental --output burst.mp4
+
+# Import libraries
+import argparse
+import queue
+import sys
+import threading
+import time
+
+import cv2
+import numpy
+
+import incremental
+import posterize
+import trackbars
+
+# Number of frame buffers shared by the threads.
+POOL_SIZE = 4
+
+
+# Function to open a video file, or a camera when given a device index
+def open_capture(source):
+    if source.isdigit():
+        return cv2.VideoCapture(int(source)), True
+    return cv2.VideoCapture(source), False
+
+
+# Function to allocate the pool of [frame, grayscale, customized] buffers
+def allocate_pool(frame_height, frame_width, pool_size=POOL_SIZE):
+    return [[numpy.zeros((frame_height, frame_width, 3), numpy.uint8),
+             numpy.zeros((frame_height, frame_width), numpy.uint8),
+             numpy.zeros((frame_height, frame_width, 3), numpy.uint8)]
+            for slot in range(pool_size)]
+
+
+# Function to read the next frame into a pool buffer. Returns False at the
+# end of the stream.
+def read_frame(capture, frame_buffer):
+    frame_read, frame = capture.read(frame_buffer)
+    if not frame_read:
+        return False
+    if not numpy.may_share_memory(frame, frame_buffer):
+        # The frame came back in a new buffer (different size or type).
+        if frame.shape != frame_buffer.shape:
+            raise ValueError(f"Frame size {frame.shape[1]}x{frame.shape[0]} does not match the "
+                             f"reported size {frame_buffer.shape[1]}x{frame_buffer.shape[0]}.")
+        frame_buffer[...] = frame
+    return True
+
+
+# Function to pass the end-of-stream marker down a queue. Gives up once
+# stop_event is set, since nobody may be reading the queue any more.
+def put_end_marker(target_queue, stop_event):
+    while True:
+        try:
+            target_queue.put(None, timeout=0.1)
+            return
+        except queue.Full:
+            if stop_event.is_set():
+                return
+
+
+# Function run by the capture thread. Reads frames into free buffers. If no
+# buffer is free and drop_frames is set, the oldest frame still waiting to
+# be processed is reused, or the frame is grabbed and thrown away. The end
+# marker is always sent, even if reading fails, so the other threads finish.
+def capture_frames(capture, pool, free_slots, captured, stop_event, drop_frames, stats):
+    try:
+        while not stop_event.is_set():
+            try:
+                slot = free_slots.get_nowait()
+            except queue.Empty:
+                if not drop_frames:
+                    try:
+                        slot = free_slots.get(timeout=0.1)
+                    except queue.Empty:
+                        continue
+                else:
+                    try:
+                        slot = captured.get_nowait()
+                    except queue.Empty:
+                        # Every buffer is busy further down the pipeline.
+                        if not capture.grab():
+                            break
+                        stats['dropped'] += 1
+                        continue
+                    stats['dropped'] += 1
+
+            if not read_frame(capture, pool[slot][0]):
+                free_slots.put(slot)
+                break
+            stats['captured'] += 1
+            captured.put(slot)
+    except Exception as capture_error:
+        stats['error'] = f"Capture failed: {capture_error}"
+    finally:
+        put_end_marker(captured, stop_event)
+
+
+# Function run by the process thread. Colors each frame with the current
+# lookup table, writing into the frame's own buffers. With a tracker, only
+# the blocks that changed since the last frame are colored again. The end
+# marker is always sent on, even if coloring fails.
+def process_frames(pool, captured, processed, color_lut_holder, stats, tracker=None, stop_event=None):
+    try:
+        while True:
+            slot = captured.get()
+            if slot is None:
+                break
+            frame, grayscale_frame, customized_frame = pool[slot]
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=grayscale_frame)
+            if tracker is None:
+                posterize.apply_lut(grayscale_frame, color_lut_holder[0], out=customized_frame)
+            else:
+                numpy.copyto(customized_frame,
+                             incremental.recolor_incremental(tracker, grayscale_frame, color_lut_holder[0]))
+            stats['processed'] += 1
+            processed.put(slot)
+    except Exception as process_error:
+        stats['error'] = f"Processing failed: {process_error}"
+        # Stop the capture thread too.
+        if stop_event is not None:
+            stop_event.set()
+    finally:
+        processed.put(None)
+
+
+# Function run by the writer thread. Encodes finished frames, then gives
+# their buffers back to the capture thread.
+def write_frames(writer, pool, finished, free_slots):
+    while True:
+        slot = finished.get()
+        if slot is None:
+            break
+        writer.write(pool[slot][2])
+        free_slots.put(slot)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Posterize a video file or camera in real time.")
+    parser.add_argument('source', help="video file, or camera device index such as 0")
+    parser.add_argument('--output', default=None, help="save the result to this video file")
+    parser.add_argument('--fourcc', default='mp4v', help="four character code of the output codec")
+    parser.add_argument('--no-display', action='store_true', help="do not open any windows")
+    parser.add_argument('--scheme', default=None, help="color scheme to start from (JSON or compiled .bin)")
+    parser.add_argument('--breakpoints', default=None, help="grayscale break points such as 50,85,127")
+    parser.add_argument('--palette', default=None, help="colors as B,G,R;B,G,R;... (one more than break points)")
+    parser.add_argument('--bands', type=int, default=trackbars.NUMBER_OF_COLORS,
+                        help="number of bands when no break points, palette or scheme are given, 2 to 256")
+    parser.add_argument('--auto', choices=('otsu', 'quantile'), default=None,
+                        help="pick the break points automatically from the first frame")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only color the blocks that changed since the last frame")
+    parser.add_argument('--block-size', type=int, default=incremental.DEFAULT_BLOCK_SIZE,
+                        help="side of the compared blocks in pixels, with --incremental")
+    parser.add_argument('--change-threshold', type=int, default=incremental.DEFAULT_CHANGE_THRESHOLD,
+                        help="largest pixel change ignored as noise, with --incremental (0 is exact)")
+    parser.add_argument('--drop-frames', action='store_true', default=None,
+                        help="drop frames when processing falls behind (default for cameras)")
+    parser.add_argument('--keep-all-frames', action='store_false', dest='drop_frames',
+                        help="never drop frames (default for video files)")
+    args = parser.parse_args(argv)
+    if not posterize.MIN_BANDS <= args.bands <= posterize.MAX_BANDS:
+        parser.error(f"--bands must be from {posterize.MIN_BANDS} to {posterize.MAX_BANDS}")
+    # Without windows there are no trackbars to pick the colors with.
+    if args.no_display and not (args.scheme or args.palette):
+        parser.error("give --scheme or --palette to pick the colors when using --no-display")
+
+    capture, is_camera = open_capture(args.source)
+    if not capture.isOpened():
+        print(f"Could not open {args.source}.")
+        return 1
+    drop_frames = is_camera if args.drop_frames is None else args.drop_frames
+
+    frame_width = int(capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+    frame_height = int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    frames_per_second = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    pool = allocate_pool(frame_height, frame_width)
+
+    # --auto needs the first frame before anything starts. It goes into the
+    # first buffer and is processed like any other frame.
+    first_slot = None
+    try:
+        if args.auto:
+            if not read_frame(capture, pool[0][0]):
+                print(f"Could not read a frame from {args.source}.")
+                return 1
+            cv2.cvtColor(pool[0][0], cv2.COLOR_BGR2GRAY, dst=pool[0][1])
+            first_slot = 0
+        breakpoints, palette, scheme_lut = trackbars.starting_bands(args, pool[0][1])
+    except (OSError, ValueError) as settings_error:
+        print(f"Error: {settings_error}")
+        return 1
+    number_of_colors = len(breakpoints) + 1
+
+    writer = None
+    if args.output:
+        writer = cv2.VideoWriter(args.output, cv2.VideoWriter_fourcc(*args.fourcc),
+                                 frames_per_second, (frame_width, frame_height))
+        if not writer.isOpened():
+            print(f"Could not open {args.output} for writing.")
+            return 1
+
+    # The color lookup table is swapped in whole by the main thread, so the
+    # process thread always sees a complete table. Without colors it starts
+    # black until the trackbars are moved.
+    if scheme_lut is not None:
+        color_lut_holder = [scheme_lut]
+    else:
+        color_lut_holder = [posterize.build_color_lut(breakpoints, palette or [[0, 0, 0]] * number_of_colors)]
+    dirty = {'lut': False}
+
+    def mark_lut_dirty(position):
+        dirty['lut'] = True
+
+    if not args.no_display:
+        cv2.namedWindow('Customized Video')
+        trackbars.create_trackbar_windows(number_of_colors)
+        trackbars.create_trackbars(mark_lut_dirty, mark_lut_dirty, number_of_colors, breakpoints)
+        if palette is not None:
+            trackbars.set_palette(palette)
+        # The scheme's own table is kept until a trackbar is moved.
+        dirty['lut'] = False
+
+    free_slots = queue.Queue(maxsize=POOL_SIZE)
+    for slot in range(POOL_SIZE):
+        if slot != first_slot:
+            free_slots.put(slot)
+    captured = queue.Queue(maxsize=POOL_SIZE)
+    processed = queue.Queue(maxsize=POOL_SIZE)
+    finished = queue.Queue(maxsize=POOL_SIZE)
+    stop_event = threading.Event()
+    stats = {'captured': 0, 'processed': 0, 'dropped': 0}
+    if first_slot is not None:
+        captured.put(first_slot)
+        stats['captured'] += 1
+    tracker = incremental.create_tracker(args.block_size, args.change_threshold) if args.incremental else None
+
+    threads = [
+        threading.Thread(target=capture_frames, daemon=True,
+                         args=(capture, pool, free_slots, captured, stop_event, drop_frames, stats)),
+        threading.Thread(target=process_frames, daemon=True,
+                         args=(pool, captured, processed, color_lut_holder, stats, tracker, stop_event)),
+    ]
+    if writer is not None:
+        threads.append(threading.Thread(target=write_frames, daemon=True,
+                                        args=(writer, pool, finished, free_slots)))
+    for thread in threads:
+        thread.start()
+
+    start_time = time.perf_counter()
+    while True:
+        # HighGUI has to run on the main thread, so the trackbars are read here.
+        if not args.no_display:
+            keypressed = cv2.waitKey(1)
+            if keypressed == 27 or keypressed == ord('q'):
+                stop_event.set()
+            if dirty['lut']:
+                dirty['lut'] = False
+                color_lut_holder[0] = posterize.build_color_lut(trackbars.read_breakpoints(number_of_colors),
+                                                                trackbars.read_palette(number_of_colors))
+
+        try:
+            slot = processed.get(timeout=0.01)
+        except queue.Empty:
+            continue
+        if slot is None:
+            break
+        if not args.no_display:
+            cv2.imshow('Customized Video', pool[slot][2])
+        if writer is not None:
+            finished.put(slot)
+        else:
+            free_slots.put(slot)
+
+    # Let the capture thread stop, then wait for every thread to finish.
+    stop_event.set()
+    finished.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+
+    capture.release()
+    if writer is not None:
+        writer.release()
+    if not args.no_display:
+        cv2.destroyAllWindows()
+        # WaitKey added for Macs to properly end program.
+        cv2.waitKey(1)
+
+    frames_per_second = stats['processed'] / elapsed if elapsed > 0 else 0.0
+    print(f"Processed {stats['processed']} of {stats['captured']} frames "
+          f"({frames_per_second:.1f} fps), dropped {stats['dropped']}.")
+    if tracker is not None:
+        print(f"Incremental: {incremental.format_tracker(tracker)}.")
+    if 'error' in stats:
+        print(stats['error'])
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())